@@ -1,54 +1,124 @@
 from flask import Flask, render_template, request, jsonify, session
 from flask_cors import CORS
+from cachetools import LRUCache
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import atexit
+import functools
+import itertools
+import multiprocessing
 import os
+import threading
 import uuid
 
-from config import OPENAI_API_KEY, OPENAI_MODEL, CHROMA_DB_PATH, COLLECTION_NAME, CHUNK_SIZE, CHUNK_OVERLAP
+from config import (
+    OPENAI_API_KEY, OPENAI_MODEL, LLM_CACHE_DIR, TEXT_CACHE_DIR, CHROMA_DB_PATH, COLLECTION_NAME, CHUNK_SIZE, CHUNK_OVERLAP,
+    ALLOWED_IMAGE_EXTENSIONS, WORKERS, LLM_WORKERS, MAX_CONTEXT_CHARS, CHAT_HISTORY_LENGTH,
+    OPENAI_MAX_REQUESTS_PER_MINUTE, OPENAI_MAX_TOKENS_PER_MINUTE
+)
 from database.vector_db import VectorDatabase
 from llm.openai_handler import OpenAIHandler
+from llm.rate_limiter import RateLimiter
 from processors.text_processor import TextProcessor
 from processors.image_processor import ImageProcessor
 from processors.media_processor import MediaProcessor
-from utils.file_handler import FileHandler
+from utils.file_handler import FileHandler, file_extension
+from utils.json_provider import OrjsonProvider, ORJSON_AVAILABLE
 
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 CORS(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 
+# One database for the whole process; sessions are separated by metadata
+_DB = None
+_DB_LOCK = threading.Lock()
+
+app.llms = LRUCache(maxsize=64)
+_LLMS_LOCK = threading.Lock()
+
+# All handlers share the API key, so they share one request/token budget. Every LLM
+# call is made from this process (worker processes only extract), so one limiter covers them
+_RATE_LIMITER = RateLimiter(OPENAI_MAX_REQUESTS_PER_MINUTE, OPENAI_MAX_TOKENS_PER_MINUTE)
+
+def get_session_id():
+    """Get or create the ID of the current session"""
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    return session['session_id']
+
+def get_session_filter():
+    """Metadata filter restricting queries to the current session's documents"""
+    return {"session_id": get_session_id()}
+
 def get_db():
-    """Get or create database instance for session"""
-    if 'db' not in session or not hasattr(app, 'dbs'):
-        if not hasattr(app, 'dbs'):
-            app.dbs = {}
-        session_id = session.get('session_id', str(uuid.uuid4()))
-        session['session_id'] = session_id
-        if session_id not in app.dbs:
-            app.dbs[session_id] = VectorDatabase(CHROMA_DB_PATH, COLLECTION_NAME)
-        return app.dbs[session_id]
-    return app.dbs[session['session_id']]
+    """Get or create the shared database instance"""
+    global _DB
+    with _DB_LOCK:
+        if _DB is None:
+            _DB = VectorDatabase(CHROMA_DB_PATH, COLLECTION_NAME)
+        return _DB
 
 def get_llm():
     """Get or create LLM instance for session"""
-    if 'llm' not in session or not hasattr(app, 'llms'):
-        if not hasattr(app, 'llms'):
-            app.llms = {}
-        session_id = session.get('session_id', str(uuid.uuid4()))
-        session['session_id'] = session_id
+    session_id = get_session_id()
+    with _LLMS_LOCK:
         if session_id not in app.llms:
-            app.llms[session_id] = OpenAIHandler(api_key=OPENAI_API_KEY, model_name=OPENAI_MODEL)
+            app.llms[session_id] = OpenAIHandler(
+                api_key=OPENAI_API_KEY, model_name=OPENAI_MODEL, cache_dir=LLM_CACHE_DIR, rate_limiter=_RATE_LIMITER
+            )
         return app.llms[session_id]
-    return app.llms[session['session_id']]
+
+_CHAT_TEMPLATE = """You are an intelligent AI assistant with strong language understanding capabilities. You should:
+1. Automatically understand and correct any spelling mistakes or typos in the user's question
+2. Interpret the user's intent even if the question is poorly written
+3. Answer in clear, natural, easy-to-understand language
+4. Be conversational and helpful
+
+Context from uploaded documents:
+{context}
+
+User's Question (may contain typos - understand the intent): {message}
+
+Instructions:
+- First, understand what the user is really asking (correct any spelling/grammar issues mentally)
+- Then, provide a comprehensive answer based ONLY on the context above
+- Answer in natural, conversational language that's easy to understand
+- If the context doesn't contain the answer, politely say "I don't have that information in the uploaded documents"
+
+Your helpful answer:"""
+
+def build_context(context_docs, max_chars=MAX_CONTEXT_CHARS):
+    """Join the highest-ranked context documents that fit in the character budget"""
+    separator = "\n\n"
+    totals = itertools.accumulate(len(doc) + len(separator) for doc in context_docs)
+    count = sum(1 for _ in itertools.takewhile(lambda total: total <= max_chars + len(separator), totals))
+    # Always keep the best match, even if it alone exceeds the budget
+    return separator.join(context_docs[:max(count, 1)])
+
+# Chat history is kept server-side so it is not re-serialized into the session cookie
+_CHAT_HISTORIES = LRUCache(maxsize=1024)
+_CHAT_LOCK = threading.Lock()
 
 def get_chat_history():
     """Get chat history for session"""
-    return session.get('chat_history', [])
+    with _CHAT_LOCK:
+        return list(_CHAT_HISTORIES.get(get_session_id(), ()))
 
 def add_chat_message(role, content):
     """Add message to chat history"""
-    if 'chat_history' not in session:
-        session['chat_history'] = []
-    session['chat_history'].append({"role": role, "content": content})
-    session.modified = True
+    session_id = get_session_id()
+    with _CHAT_LOCK:
+        if session_id not in _CHAT_HISTORIES:
+            _CHAT_HISTORIES[session_id] = deque(maxlen=CHAT_HISTORY_LENGTH)
+        _CHAT_HISTORIES[session_id].append({"role": role, "content": content})
+
+def clear_chat_history():
+    """Clear chat history for session"""
+    with _CHAT_LOCK:
+        _CHAT_HISTORIES.pop(get_session_id(), None)
 
 def get_processed_files():
     """Get processed files for session"""
@@ -61,106 +131,172 @@ def add_processed_file(name, status, message):
     session['processed_files'].append({'name': name, 'status': status, 'message': message})
     session.modified = True
 
-def process_text_document(file_path, file_name):
-    """Process text document and add to database"""
-    extension = os.path.splitext(file_name)[1].lower()
+def _ingest_result(name, status, message, documents=None, metadatas=None, cleanup=None):
+    """Build the result returned by the ingestion workers"""
+    return {
+        'name': name,
+        'status': status,
+        'message': message,
+        'documents': documents or [],
+        'metadatas': metadatas or [],
+        'cleanup': cleanup or []
+    }
+
+# Worker processes start from a clean forkserver (spawn where unavailable), never by forking
+# this multi-threaded process, whose live threads could leave a child deadlocked
+_PROCESS_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# Ingestion workers are created on first use and kept across requests, so per-process
+# state (Whisper client, loaded models) is reused instead of rebuilt for every upload
+_PROCESS_POOL = None
+_PROCESS_POOL_LOCK = threading.Lock()
+
+def get_process_pool():
+    """Get or create the shared ingestion process pool"""
+    global _PROCESS_POOL
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is None:
+            _PROCESS_POOL = ProcessPoolExecutor(max_workers=WORKERS, mp_context=_PROCESS_CONTEXT)
+        return _PROCESS_POOL
+
+def submit_to_process_pool(fn, *args):
+    """Submit a task to the shared process pool, replacing the pool if a worker died"""
+    global _PROCESS_POOL
+    pool = get_process_pool()
     try:
-        if extension == '.pdf':
-            text = TextProcessor.process_pdf(file_path)
-        elif extension == '.docx':
-            text = TextProcessor.process_docx(file_path)
-        elif extension == '.pptx':
-            text = TextProcessor.process_pptx(file_path)
-        elif extension == '.txt':
-            text = TextProcessor.process_txt(file_path)
-        elif extension == '.md':
-            text = TextProcessor.process_markdown(file_path)
-        else:
-            return None, "Unsupported format"
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        with _PROCESS_POOL_LOCK:
+            if _PROCESS_POOL is pool:
+                _PROCESS_POOL = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return get_process_pool().submit(fn, *args)
+
+def _shutdown_process_pool():
+    """Stop the ingestion workers at exit"""
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is not None:
+            _PROCESS_POOL.shutdown(wait=True, cancel_futures=True)
+
+atexit.register(_shutdown_process_pool)
+
+# Temporary files are deleted in the background so responses don't wait on disk I/O
+_CLEANUP_POOL = ThreadPoolExecutor(max_workers=2)
+atexit.register(_CLEANUP_POOL.shutdown, wait=True)
+
+def _cleanup_paths(paths):
+    """Delete temporary files, ignoring errors"""
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+_WORKER_LLM = None
+
+def _worker_llm():
+    """Get the LLM instance shared by the ingestion workers of this process"""
+    global _WORKER_LLM
+    if _WORKER_LLM is None:
+        _WORKER_LLM = OpenAIHandler(
+            api_key=OPENAI_API_KEY, model_name=OPENAI_MODEL, cache_dir=LLM_CACHE_DIR, rate_limiter=_RATE_LIMITER
+        )
+    return _WORKER_LLM
+
+def process_text_document(file_path, file_name, extension, pdf_workers=1):
+    """Extract and chunk a text document (runs in a worker process)"""
+    try:
+        handler = _TEXT_HANDLERS.get(extension)
+        if handler is None:
+            return _ingest_result(file_name, 'error', 'Error: Unsupported format')
+        if extension == '.pdf' and pdf_workers > 1:
+            handler = functools.partial(TextProcessor.process_pdf_parallel, workers=pdf_workers)
+        text = TextProcessor.extract_text_cached(file_path, handler, TEXT_CACHE_DIR)
 
         if not text or len(text.strip()) == 0:
-            return None, "No text found"
+            return _ingest_result(file_name, 'error', 'Error: No text found')
 
-        chunks = []
-        for i in range(0, len(text), CHUNK_SIZE - CHUNK_OVERLAP):
-            chunk = text[i:i + CHUNK_SIZE]
-            if chunk.strip():
-                chunks.append(chunk)
+        chunks = TextProcessor.chunk_text(text, CHUNK_SIZE, CHUNK_OVERLAP)
 
         metadatas = [{"source": file_name, "type": "text", "chunk": i} for i in range(len(chunks))]
-        db = get_db()
-        db.add_documents(chunks, metadatas)
-        return len(chunks), None
+        return _ingest_result(file_name, 'success', f'✅ Processed {len(chunks)} chunks', chunks, metadatas)
     except Exception as e:
-        return None, str(e)
+        return _ingest_result(file_name, 'error', f'Error: {str(e)}')
 
 def process_image_file(file_path, file_name):
-    """Process image file and add to database"""
+    """Analyze an image with the LLM (runs in a worker thread)"""
     try:
-        image_info = ImageProcessor.process_image(file_path)
+        # Rejects files that are not valid images before spending an API call
+        ImageProcessor.process_image(file_path)
         prompt = "Describe this image in detail. What do you see? Include objects, people, colors, text, and any other relevant details."
-        llm = get_llm()
+        llm = _worker_llm()
         description = llm.analyze_image(file_path, prompt)
 
         if description:
-            db = get_db()
-            db.add_documents([description], [{"source": file_name, "type": "image"}])
-            return description, None
-        return None, "Failed to analyze"
+            return _ingest_result(file_name, 'success', f'✅ Analyzed ({len(description)} chars)',
+                                  [description], [{"source": file_name, "type": "image"}])
+        return _ingest_result(file_name, 'error', 'Error: Failed to analyze')
     except Exception as e:
-        return None, str(e)
+        return _ingest_result(file_name, 'error', f'Error: {str(e)}')
 
 def process_video_file(file_path, file_name):
-    """Process video file and add to database"""
+    """Extract video frames in a worker process, then summarize them with the LLM (runs in a thread)"""
     try:
-        frame_paths = MediaProcessor.extract_video_frames(file_path, num_frames=8)
+        # Decoding is CPU bound; the LLM call stays here so it draws on the shared _RATE_LIMITER
+        frame_paths = submit_to_process_pool(MediaProcessor.extract_video_frames, file_path, 8).result()
 
         if frame_paths:
             prompt = "Analyze these video frames in sequence and provide a comprehensive summary of what happens in the video. Describe the main events, actions, objects, and any text visible."
-            llm = get_llm()
+            llm = _worker_llm()
             summary = llm.analyze_video_frames(frame_paths, prompt)
 
+            # Frames are deleted once the result is collected
             if summary:
-                db = get_db()
-                db.add_documents([summary], [{"source": file_name, "type": "video"}])
-
-                for fp in frame_paths:
-                    try:
-                        if os.path.exists(fp):
-                            os.remove(fp)
-                    except:
-                        pass
-                return summary, None
-            return None, "Failed to analyze"
-        return None, "Failed to extract frames"
+                return _ingest_result(file_name, 'success', f'✅ Analyzed ({len(summary)} chars)',
+                                      [summary], [{"source": file_name, "type": "video"}], cleanup=frame_paths)
+            return _ingest_result(file_name, 'error', 'Error: Failed to analyze', cleanup=frame_paths)
+        return _ingest_result(file_name, 'error', 'Error: Failed to extract frames')
     except Exception as e:
-        return None, str(e)
+        return _ingest_result(file_name, 'error', f'Error: {str(e)}')
 
 def process_audio_file(file_path, file_name):
-    """Process audio file and add to database"""
+    """Transcribe and chunk an audio file (runs in a worker process)"""
     try:
         transcript = MediaProcessor.transcribe_audio(file_path)
 
         if transcript:
-            chunks = []
-            for i in range(0, len(transcript), CHUNK_SIZE - CHUNK_OVERLAP):
-                chunk = transcript[i:i + CHUNK_SIZE]
-                if chunk.strip():
-                    chunks.append(chunk)
+            chunks = TextProcessor.chunk_text(transcript, CHUNK_SIZE, CHUNK_OVERLAP)
 
             metadatas = [{"source": file_name, "type": "audio", "chunk": i} for i in range(len(chunks))]
-            db = get_db()
-            db.add_documents(chunks, metadatas)
-            return len(chunks), None
-        return None, "Failed to transcribe"
+            return _ingest_result(file_name, 'success', f'✅ Processed {len(chunks)} chunks', chunks, metadatas)
+        return _ingest_result(file_name, 'error', 'Error: Failed to transcribe')
     except Exception as e:
-        return None, str(e)
+        return _ingest_result(file_name, 'error', f'Error: {str(e)}')
+
+# Extension dispatch tables, built once at import
+_TEXT_HANDLERS = {
+    '.pdf': TextProcessor.process_pdf,
+    '.docx': TextProcessor.process_docx,
+    '.pptx': TextProcessor.process_pptx,
+    '.txt': TextProcessor.process_txt,
+    '.md': TextProcessor.process_markdown
+}
+_MEDIA_HANDLERS = {
+    '.mp4': process_video_file,
+    '.mp3': process_audio_file,
+    '.png': process_image_file,
+    '.jpg': process_image_file,
+    '.jpeg': process_image_file
+}
 
 @app.route('/')
 def index():
     """Main page"""
     db = get_db()
-    doc_count = db.count_documents()
+    doc_count = db.count_documents(get_session_filter())
     chat_history = get_chat_history()
     processed_files = get_processed_files()
     return render_template('index.html',
@@ -179,6 +315,8 @@ def api_process_files():
         success_count = 0
         total_files = len(files)
 
+        # Save every upload before dispatching so workers only see paths on disk
+        saved_files = []
         for file in files:
             if file.filename == '':
                 continue
@@ -187,39 +325,61 @@ def api_process_files():
             if not file_path:
                 add_processed_file(file.filename, 'error', 'Failed to save file')
                 continue
-
-            extension = os.path.splitext(file.filename)[1].lower()
-
-            if extension in ['.pdf', '.docx', '.pptx', '.txt', '.md']:
-                result, error = process_text_document(file_path, file.filename)
-                if error:
-                    add_processed_file(file.filename, 'error', f'Error: {error}')
+            saved_files.append((file_path, file.filename))
+
+        documents = []
+        metadatas = []
+
+        # Extraction is CPU/subprocess bound and goes to processes; LLM calls (images,
+        # and videos once their frames are extracted) go to threads in this process
+        with ThreadPoolExecutor(max_workers=LLM_WORKERS) as thread_pool:
+            # Spare processes go to splitting PDFs by page when there are fewer files than workers
+            pdf_workers = max(1, WORKERS // max(1, len(saved_files)))
+            futures = {}
+            for file_path, file_name in saved_files:
+                extension = file_extension(file_name)
+
+                if extension in _TEXT_HANDLERS:
+                    future = submit_to_process_pool(process_text_document, file_path, file_name, extension, pdf_workers)
+                elif extension in _MEDIA_HANDLERS:
+                    handler = _MEDIA_HANDLERS[extension]
+                    if extension in ALLOWED_IMAGE_EXTENSIONS or handler is process_video_file:
+                        future = thread_pool.submit(handler, file_path, file_name)
+                    else:
+                        future = submit_to_process_pool(handler, file_path, file_name)
                 else:
-                    add_processed_file(file.filename, 'success', f'✅ Processed {result} chunks')
+                    add_processed_file(file_name, 'error', f'Unsupported format: {extension}')
+                    continue
+                futures[future] = (file_path, file_name)
+
+            ingested_paths = []
+            for future in as_completed(futures):
+                file_path, file_name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    add_processed_file(file_name, 'error', f'Error: {str(e)}')
+                    continue
+
+                add_processed_file(result['name'], result['status'], result['message'])
+                if result['cleanup']:
+                    _CLEANUP_POOL.submit(_cleanup_paths, result['cleanup'])
+                if result['status'] == 'success':
+                    documents.extend(result['documents'])
+                    metadatas.extend(result['metadatas'])
+                    ingested_paths.append(file_path)
                     success_count += 1
-            elif extension in ['.png', '.jpg', '.jpeg']:
-                result, error = process_image_file(file_path, file.filename)
-                if error:
-                    add_processed_file(file.filename, 'error', f'Error: {error}')
-                else:
-                    add_processed_file(file.filename, 'success', f'✅ Analyzed ({len(result)} chars)')
-                    success_count += 1
-            elif extension == '.mp4':
-                result, error = process_video_file(file_path, file.filename)
-                if error:
-                    add_processed_file(file.filename, 'error', f'Error: {error}')
-                else:
-                    add_processed_file(file.filename, 'success', f'✅ Analyzed ({len(result)} chars)')
-                    success_count += 1
-            elif extension == '.mp3':
-                result, error = process_audio_file(file_path, file.filename)
-                if error:
-                    add_processed_file(file.filename, 'error', f'Error: {error}')
-                else:
-                    add_processed_file(file.filename, 'success', f'✅ Processed {result} chunks')
-                    success_count += 1
-            else:
-                add_processed_file(file.filename, 'error', f'Unsupported format: {extension}')
+
+        # Chroma writes stay in the main process, once per request
+        if documents:
+            session_id = get_session_id()
+            for metadata in metadatas:
+                metadata['session_id'] = session_id
+            db = get_db()
+            db.add_documents(documents, metadatas)
+
+            # Uploads are no longer needed once their content is indexed
+            _CLEANUP_POOL.submit(_cleanup_paths, ingested_paths)
 
         return jsonify({
             'success': True,
@@ -246,17 +406,19 @@ def api_process_youtube():
             transcript = result['content']
 
             if transcript and len(transcript.strip()) > 0:
-                chunks = []
-                for i in range(0, len(transcript), CHUNK_SIZE - CHUNK_OVERLAP):
-                    chunk = transcript[i:i + CHUNK_SIZE]
-                    if chunk.strip():
-                        chunks.append(chunk)
-
-                metadatas = [{"source": url, "type": "youtube", "chunk": i} for i in range(len(chunks))]
+                # Metadata is generated lazily as the database consumes the chunks
+                chunks = TextProcessor.chunk_text(transcript, CHUNK_SIZE, CHUNK_OVERLAP)
+                session_id = get_session_id()
+                # One metadata dict is drawn per chunk, so the counter ends at the chunk count
+                chunk_numbers = itertools.count()
+                metadatas = ({"source": url, "type": "youtube", "chunk": i, "session_id": session_id}
+                             for i in chunk_numbers)
                 db = get_db()
-                db.add_documents(chunks, metadatas)
+                added = db.add_documents_pipelined(chunks, metadatas)
+                chunk_count = next(chunk_numbers)
 
-                message = f"✅ Processed {len(chunks)} chunks ({len(transcript)} characters)"
+                # Chunks already stored for this session are skipped, so report both counts
+                message = f"✅ Processed {chunk_count} chunks, {added} new ({len(transcript)} characters)"
                 add_processed_file(url, 'success', message)
                 return jsonify({'success': True, 'message': message})
             else:
@@ -278,50 +440,39 @@ def api_chat():
 
         add_chat_message('user', message)
 
-        # Try multiple search strategies to find relevant content
         db = get_db()
-        results = db.query(message, n_results=15)
+        session_filter = get_session_filter()
+        no_documents_response = "I don't have any relevant information to answer that question. Please upload some documents first! 📁"
+
+        # Nothing to search - skip embedding the question entirely
+        if db.count_documents(session_filter) == 0:
+            add_chat_message('assistant', no_documents_response)
+            return jsonify({'success': True, 'response': no_documents_response})
+
+        # Embed the question once and fetch the broader result set up front
+        embedding = VectorDatabase.embed_query(message)
+        results = db.query_by_embedding(embedding, n_results=20, filter_dict=session_filter)
 
         if results and results.get('documents') and results['documents'][0]:
-            context_docs = results['documents'][0]
+            documents = results['documents'][0]
 
             # Filter out empty contexts
-            context_docs = [doc for doc in context_docs if doc and doc.strip()]
+            context_docs = [doc for doc in documents[:15] if doc and doc.strip()]
 
-            # If we got very few results, try broader search
-            if len(context_docs) < 5 and db.count_documents() > 10:
-                results = db.query(message, n_results=20)
-                if results and results.get('documents') and results['documents'][0]:
-                    context_docs = [doc for doc in results['documents'][0] if doc and doc.strip()]
+            # If we got very few results, use the broader search
+            if len(context_docs) < 5 and db.count_documents(session_filter) > 10:
+                context_docs = [doc for doc in documents if doc and doc.strip()]
 
             if context_docs:
-                context = "\n\n".join(context_docs)
-
-                enhanced_prompt = f"""You are an intelligent AI assistant with strong language understanding capabilities. You should:
-1. Automatically understand and correct any spelling mistakes or typos in the user's question
-2. Interpret the user's intent even if the question is poorly written
-3. Answer in clear, natural, easy-to-understand language
-4. Be conversational and helpful
-
-Context from uploaded documents:
-{context}
-
-User's Question (may contain typos - understand the intent): {message}
-
-Instructions:
-- First, understand what the user is really asking (correct any spelling/grammar issues mentally)
-- Then, provide a comprehensive answer based ONLY on the context above
-- Answer in natural, conversational language that's easy to understand
-- If the context doesn't contain the answer, politely say "I don't have that information in the uploaded documents"
-
-Your helpful answer:"""
+                context = build_context(context_docs)
+                enhanced_prompt = _CHAT_TEMPLATE.format(context=context, message=message)
 
                 llm = get_llm()
                 response = llm.generate_response(enhanced_prompt, context=None)
             else:
                 response = "I found some documents but they don't contain relevant information to answer your question. 📄"
         else:
-            response = "I don't have any relevant information to answer that question. Please upload some documents first! 📁"
+            response = no_documents_response
 
         add_chat_message('assistant', response)
         return jsonify({'success': True, 'response': response})
@@ -336,14 +487,14 @@ def api_clear_database():
     """API endpoint to clear database"""
     try:
         session_id = session.get('session_id')
-        if session_id and hasattr(app, 'dbs') and session_id in app.dbs:
-            app.dbs[session_id].delete_collection()
-            app.dbs[session_id] = VectorDatabase(CHROMA_DB_PATH, COLLECTION_NAME)
+        if session_id:
+            get_db().delete_documents(filter_dict={"session_id": session_id})
 
-        if session_id and hasattr(app, 'llms') and session_id in app.llms:
-            del app.llms[session_id]
+        with _LLMS_LOCK:
+            if session_id and session_id in app.llms:
+                del app.llms[session_id]
 
-        session['chat_history'] = []
+        clear_chat_history()
         session['processed_files'] = []
         session.modified = True
 
@@ -352,5 +503,16 @@ def api_clear_database():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def warm_up():
+    """Open the database and load the embedding model ahead of the first request"""
+    try:
+        get_db()
+        VectorDatabase.embed_query("warm up")
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
 if __name__ == "__main__":
+    # The debug reloader runs this block twice; only the serving child needs the warm-up
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        threading.Thread(target=warm_up, daemon=True).start()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -14,6 +14,12 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 # Select which LLM to use: "openai" or "gemini"
 LLM_PROVIDER = "openai"  # Change to "gemini" if you want to use Gemini
 
+# LLM responses are cached on disk by content hash
+LLM_CACHE_DIR = "./.llm_cache"
+
+# Text extracted from documents is cached on disk by file content hash
+TEXT_CACHE_DIR = "./.text_cache"
+
 # Database Configuration
 CHROMA_DB_PATH = "./chroma_db"
 COLLECTION_NAME = "multimodal_knowledge_base"
@@ -24,10 +30,19 @@ ALLOWED_TEXT_EXTENSIONS = {'.pdf', '.docx', '.pptx', '.md', '.txt'}
 ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
 ALLOWED_MEDIA_EXTENSIONS = {'.mp3', '.mp4'}
 MAX_FILE_SIZE_MB = 200
+UPLOAD_BUFFER_SIZE = 4 * 1024 * 1024  # Copy buffer used when saving uploads
 
 # Processing Configuration
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# HuggingFace tokenizer to chunk by tokens instead of characters (e.g. "bert-base-uncased"); empty disables
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "")
+CHUNK_TOKEN_SIZE = 256
+CHUNK_TOKEN_OVERLAP = 32
+
+# Parallel Ingestion Configuration
+WORKERS = int(os.getenv("WORKERS", max(1, (os.cpu_count() or 2) - 1)))  # Processes for text/audio/video extraction
+LLM_WORKERS = 8  # Threads for API-bound image analysis
 
 # LLM Configuration
 GEMINI_MODEL = "models/gemini-1.5-flash-latest"
@@ -35,6 +50,12 @@ GEMINI_VISION_MODEL = "models/gemini-1.5-flash-latest"
 OPENAI_MODEL = "gpt-4o-mini"  # or "gpt-4o", "gpt-3.5-turbo"
 TEMPERATURE = 0.7
 MAX_OUTPUT_TOKENS = 1024
+MAX_CONTEXT_CHARS = 8000  # Retrieved context sent to the LLM per chat question
+CHAT_HISTORY_LENGTH = 50  # Messages kept per session
+
+# Client-side API throttling (token buckets, per process) - match your account's rate limits
+OPENAI_MAX_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", 500))
+OPENAI_MAX_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE", 200000))
 
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
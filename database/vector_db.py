@@ -3,14 +3,56 @@ Vector database operations using ChromaDB
 """
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Optional
-import uuid
-from datetime import datetime
+from chromadb.utils import embedding_functions
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import List, Dict, Iterable, Iterator, Optional, Set, Tuple
+import functools
+import hashlib
+import itertools
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+# One client per persist directory, shared by every VectorDatabase in the process
+_CLIENTS = {}
+_LOCK = threading.Lock()
+
+
+def _get_client(persist_directory: str):
+    """Get or create the shared ChromaDB client for a persist directory"""
+    with _LOCK:
+        if persist_directory not in _CLIENTS:
+            _CLIENTS[persist_directory] = chromadb.Client(Settings(
+                persist_directory=persist_directory,
+                anonymized_telemetry=False
+            ))
+        return _CLIENTS[persist_directory]
 
 
 class VectorDatabase:
     """Manage vector database operations"""
     
+    # Documents embedded and inserted per collection.add call
+    BATCH_SIZE = 500
+    
+    # Embedding model shared by every instance, loaded on first use
+    _shared_embedder = None
+    
+    @classmethod
+    def _get_embedder(cls):
+        """
+        Get the process-wide embedding function
+        
+        Returns:
+            ChromaDB embedding function
+        """
+        with _LOCK:
+            if cls._shared_embedder is None:
+                cls._shared_embedder = embedding_functions.DefaultEmbeddingFunction()
+            return cls._shared_embedder
+    
     def __init__(self, persist_directory: str, collection_name: str):
         """
         Initialize ChromaDB client
@@ -19,40 +61,205 @@ class VectorDatabase:
             persist_directory: Directory to persist the database
             collection_name: Name of the collection
         """
-        self.client = chromadb.Client(Settings(
-            persist_directory=persist_directory,
-            anonymized_telemetry=False
-        ))
+        self.client = _get_client(persist_directory)
         
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
+            embedding_function=VectorDatabase._get_embedder(),
             metadata={"hnsw:space": "cosine"}
         )
+        
+        # Content hashes of stored chunks per session, loaded lazily for deduplication
+        self._seen_hashes = {}
+        # Document counts per filter, cleared whenever the collection changes
+        self._counts = {}
+        self._lock = threading.Lock()
     
-    def add_documents(self, documents: List[str], metadatas: List[Dict], ids: Optional[List[str]] = None):
+    def add_documents(self, documents: Iterable[str], metadatas: Iterable[Dict], ids: Optional[Iterable[str]] = None,
+                      batch_size: int = BATCH_SIZE) -> int:
         """
         Add documents to the vector database
         
+        Documents are consumed lazily, so generators are inserted one batch
+        at a time without materializing the whole input.
+        
         Args:
-            documents: List of text documents
-            metadatas: List of metadata dictionaries
-            ids: Optional list of document IDs
+            documents: Text documents (list or iterator)
+            metadatas: Metadata dictionaries, one per document
+            ids: Optional document IDs
+            batch_size: Maximum number of documents sent per collection.add call
+            
+        Returns:
+            Number of documents added
+        """
+        documents, metadatas, ids = iter(documents), iter(metadatas), None if ids is None else iter(ids)
+        timestamp = datetime.now(tz=timezone.utc).isoformat()
+        added = 0
+        
+        try:
+            while True:
+                batch_documents, batch_metadatas, batch_ids = self._next_batch(
+                    documents, metadatas, ids, batch_size, timestamp
+                )
+                if not batch_documents:
+                    return added
+                self.collection.add(
+                    documents=batch_documents,
+                    metadatas=batch_metadatas,
+                    ids=batch_ids
+                )
+                self._clear_counts()
+                added += len(batch_documents)
+        except Exception:
+            self._forget_seen_hashes()
+            raise
+    
+    def add_documents_pipelined(self, documents: Iterable[str], metadatas: Iterable[Dict],
+                                ids: Optional[Iterable[str]] = None, embeddings_chunk_size: int = 256,
+                                upsert_batch_size: int = 64, max_workers: int = 4) -> int:
         """
+        Add a large number of documents, embedding in parallel while inserting
+        
+        Embedding chunks are computed concurrently in worker threads (the
+        embedding model releases the GIL during inference) and each finished
+        chunk is inserted in smaller batches while later chunks are still
+        being embedded. At most max_workers chunks are held in memory.
+        
+        Args:
+            documents: Text documents (list or iterator)
+            metadatas: Metadata dictionaries, one per document
+            ids: Optional document IDs
+            embeddings_chunk_size: Documents embedded per worker task
+            upsert_batch_size: Documents sent per collection.add call
+            max_workers: Number of embedding threads
+            
+        Returns:
+            Number of documents added
+        """
+        documents, metadatas, ids = iter(documents), iter(metadatas), None if ids is None else iter(ids)
+        timestamp = datetime.now(tz=timezone.utc).isoformat()
+        embedder = VectorDatabase._get_embedder()
+        pending = deque()
+        added = 0
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                while True:
+                    batch = self._next_batch(documents, metadatas, ids, embeddings_chunk_size, timestamp)
+                    exhausted = not batch[0]
+                    if not exhausted:
+                        pending.append((batch, executor.submit(embedder, batch[0])))
+                    
+                    # Insert the oldest chunk once the pipeline is full or the input is exhausted
+                    while pending and (exhausted or len(pending) >= max_workers):
+                        (batch_documents, batch_metadatas, batch_ids), future = pending.popleft()
+                        embeddings = future.result()
+                        for start in range(0, len(batch_documents), upsert_batch_size):
+                            end = start + upsert_batch_size
+                            self.collection.add(
+                                embeddings=embeddings[start:end],
+                                documents=batch_documents[start:end],
+                                metadatas=batch_metadatas[start:end],
+                                ids=batch_ids[start:end]
+                            )
+                        self._clear_counts()
+                        added += len(batch_documents)
+                    
+                    if exhausted:
+                        return added
+        except Exception:
+            self._forget_seen_hashes()
+            raise
+    
+    def _next_batch(self, documents: Iterator[str], metadatas: Iterator[Dict], ids: Optional[Iterator[str]],
+                    batch_size: int, timestamp: str) -> Tuple[List[str], List[Dict], List[str]]:
+        """
+        Take the next batch of new documents, generating missing IDs and stamping metadata
+        
+        Documents whose content is already stored for the same session are
+        skipped, so re-uploads never reach the embedding model.
+        
+        Args:
+            documents: Document iterator
+            metadatas: Metadata iterator
+            ids: Optional ID iterator
+            batch_size: Maximum number of documents to take
+            timestamp: Insertion timestamp shared by the whole call
+            
+        Returns:
+            Tuple of (documents, metadatas, ids); empty lists once exhausted
+        """
+        rows = zip(documents, metadatas, ids if ids is not None else itertools.repeat(None))
+        batch_documents, batch_metadatas, batch_ids = [], [], []
+        
+        with self._lock:
+            while len(batch_documents) < batch_size:
+                taken = list(itertools.islice(rows, batch_size - len(batch_documents)))
+                if not taken:
+                    break
+                for document, metadata, doc_id in taken:
+                    digest = hashlib.sha1(document.encode('utf-8'), usedforsecurity=False).digest()
+                    seen_hashes = self._get_seen_hashes(metadata.get('session_id'))
+                    if digest in seen_hashes:
+                        continue
+                    seen_hashes.add(digest)
+                    metadata['sha1'] = digest.hex()
+                    batch_documents.append(document)
+                    batch_metadatas.append(metadata)
+                    batch_ids.append(doc_id)
+        
+        n = len(batch_documents)
         if ids is None:
-            ids = [str(uuid.uuid4()) for _ in range(len(documents))]
+            # One urandom call for every ID instead of one per uuid4()
+            raw = os.urandom(16 * n)
+            batch_ids = [raw[i * 16:(i + 1) * 16].hex() for i in range(n)]
         
         # Add timestamp to metadata
-        for metadata in metadatas:
-            metadata['timestamp'] = datetime.now().isoformat()
+        for metadata in batch_metadatas:
+            metadata['timestamp'] = timestamp
         
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        return batch_documents, batch_metadatas, batch_ids
     
-    def query(self, query_text: str, n_results: int = 5, filter_dict: Optional[Dict] = None) -> Dict:
+    def _clear_counts(self):
+        """Forget cached document counts after the collection changed"""
+        with self._lock:
+            self._counts.clear()
+    
+    def _forget_seen_hashes(self):
+        """
+        Drop the in-memory hash sets so they are reloaded from the collection
+        
+        _next_batch marks chunks as seen before they are inserted, so after a
+        failed insert the sets may list chunks that were never stored.
+        """
+        with self._lock:
+            self._seen_hashes.clear()
+    
+    def _get_seen_hashes(self, session_id: Optional[str]) -> Set[bytes]:
+        """
+        Get the content hashes already stored for a session, loading them on first use
+        
+        Args:
+            session_id: Session whose chunks to load (None for chunks without a session)
+            
+        Returns:
+            Set of sha1 digests
+        """
+        if session_id not in self._seen_hashes:
+            if session_id is None:
+                # Chroma cannot filter on a missing key; keep the unscoped chunks
+                stored = [m for m in self.collection.get(include=['metadatas'])['metadatas'] or []
+                          if m and 'session_id' not in m]
+            else:
+                stored = self.collection.get(where={'session_id': session_id}, include=['metadatas'])['metadatas'] or []
+            self._seen_hashes[session_id] = {
+                bytes.fromhex(metadata['sha1']) for metadata in stored if metadata and 'sha1' in metadata
+            }
+        return self._seen_hashes[session_id]
+    
+    def query(self, query_text: str, n_results: int = 5, filter_dict: Optional[Dict] = None,
+              include: Optional[List[str]] = None) -> Dict:
         """
         Query the vector database
         
@@ -60,6 +267,7 @@ class VectorDatabase:
             query_text: Query string
             n_results: Number of results to return
             filter_dict: Optional filter dictionary
+            include: Result fields to return (defaults to documents only)
             
         Returns:
             Query results
@@ -67,10 +275,46 @@ class VectorDatabase:
         results = self.collection.query(
             query_texts=[query_text],
             n_results=n_results,
-            where=filter_dict
+            where=filter_dict,
+            include=include or ['documents']
+        )
+        return results
+    
+    def query_by_embedding(self, embedding: List[float], n_results: int = 5,
+                           filter_dict: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict:
+        """
+        Query the vector database with a precomputed embedding
+        
+        Args:
+            embedding: Query embedding vector
+            n_results: Number of results to return
+            filter_dict: Optional filter dictionary
+            include: Result fields to return (defaults to documents only)
+            
+        Returns:
+            Query results
+        """
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=n_results,
+            where=filter_dict,
+            include=include or ['documents']
         )
         return results
     
+    @staticmethod
+    def embed_query(query_text: str) -> List[float]:
+        """
+        Embed a query string, reusing the result for repeated queries
+        
+        Args:
+            query_text: Query string
+            
+        Returns:
+            Embedding vector
+        """
+        return list(_embed_query(query_text))
+    
     def get_all_documents(self) -> Dict:
         """
         Get all documents from the collection
@@ -83,21 +327,50 @@ class VectorDatabase:
     def delete_collection(self):
         """Delete the entire collection"""
         self.client.delete_collection(name=self.collection.name)
+        with self._lock:
+            self._seen_hashes.clear()
+            self._counts.clear()
     
-    def count_documents(self) -> int:
+    def count_documents(self, filter_dict: Optional[Dict] = None) -> int:
         """
         Get count of documents in collection
         
+        Args:
+            filter_dict: Optional filter dictionary
+            
         Returns:
             Number of documents
         """
-        return self.collection.count()
+        key = json.dumps(filter_dict, sort_keys=True)
+        with self._lock:
+            if key in self._counts:
+                return self._counts[key]
+        
+        if filter_dict:
+            count = len(self.collection.get(where=filter_dict, include=[])['ids'])
+        else:
+            count = self.collection.count()
+        
+        with self._lock:
+            self._counts[key] = count
+        return count
     
-    def delete_documents(self, ids: List[str]):
+    def delete_documents(self, ids: Optional[List[str]] = None, filter_dict: Optional[Dict] = None):
         """
-        Delete specific documents by ID
+        Delete specific documents by ID or metadata filter
         
         Args:
             ids: List of document IDs to delete
+            filter_dict: Optional filter dictionary
         """
-        self.collection.delete(ids=ids)
+        self.collection.delete(ids=ids, where=filter_dict)
+        with self._lock:
+            self._seen_hashes.clear()
+            self._counts.clear()
+
+
+@functools.lru_cache(maxsize=256)
+def _embed_query(query_text: str) -> tuple:
+    """Embed a query string with the shared embedder (cached per process)"""
+    embedding = VectorDatabase._get_embedder()([query_text])[0]
+    return tuple(float(value) for value in embedding)
@@ -2,5 +2,7 @@
 LLM package for Gemini integration
 """
 from .gemini_handler import GeminiHandler
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
 
-__all__ = ['GeminiHandler']
+__all__ = ['GeminiHandler', 'RateLimiter', 'ResponseCache']
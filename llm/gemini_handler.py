@@ -75,8 +75,10 @@ Please provide a comprehensive answer based on the context provided. If the cont
             # Use vision model (gemini-1.5-flash supports vision)
             vision_model = genai.GenerativeModel('models/gemini-1.5-flash-latest')
             
-            # Load image
+            # Load image - large JPEGs are decoded at reduced scale (libjpeg scaled DCT)
             img = Image.open(image_path)
+            if img.format == "JPEG" and img.size[0] * img.size[1] > 2_000_000:
+                img.draft("RGB", (1024, 1024))
             
             # Generate response
             response = vision_model.generate_content([prompt, img])
@@ -1,29 +1,155 @@
 """
 OpenAI API handler for LLM operations
 """
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from PIL import Image
 import base64
 import io
+import mmap
+import os
+import random
+import time
+
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
+
+# Read size for streaming base64 encoding - a multiple of 3 so chunks encode without padding
+_B64_READ_SIZE = 57 * 1024
+
+_DATA_URL_PREFIX = "data:image/jpeg;base64,"
+
+# Rough token cost of one image input, used for throttling estimates
+_IMAGE_TOKEN_ESTIMATE = 800
+
+# Fixed system prompts - a stable leading message lets providers reuse the cached prompt prefix
+_IMAGE_SYSTEM_PROMPT = (
+    "You are a vision assistant that analyzes images. Describe what is shown accurately, "
+    "including objects, people, actions, and any visible text, and answer the user's question about the image."
+)
+_VIDEO_FRAME_SYSTEM_PROMPT = (
+    "You analyze individual frames taken from a video. Describe each frame in detail, "
+    "including objects, people, actions, and any visible text."
+)
+_VIDEO_SYSTEM_PROMPT = (
+    "You analyze videos from descriptions of their frames, given in chronological order. "
+    "Combine them into one coherent account of what happens in the video and answer the user's request."
+)
+
+# Frames whose hashes differ in at most this many bits are treated as duplicates
+_FRAME_HASH_DISTANCE = 5
+
+# Transient API errors worth retrying, and how many attempts to make
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+_MAX_ATTEMPTS = 5
+# Attempts on a model when another model can still be tried instead
+_FALLBACK_ATTEMPTS = 1
+# Longest wait between attempts, whatever Retry-After asks for
+_MAX_RETRY_DELAY = 30.0
+
+
+def _file_to_b64(path: str, prefix: str = "") -> str:
+    """
+    Base64-encode a file from a read-only memory map
+    
+    Pages come straight from the OS page cache, so the raw file is never
+    copied onto the Python heap. Slices are encoded with pybase64 when
+    installed, otherwise the stdlib encoder, into one buffer that already
+    holds the prefix - the payload is copied once, when decoding to str.
+    
+    Args:
+        path: Path to file
+        prefix: ASCII text to place before the encoded data
+        
+    Returns:
+        Base64 string
+    """
+    out = bytearray(prefix.encode('ascii'))
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return prefix
+        encode = pybase64.b64encode if PYBASE64_AVAILABLE else base64.b64encode
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            for start in range(0, len(view), _B64_READ_SIZE):
+                out.extend(encode(view[start:start + _B64_READ_SIZE]))
+    return out.decode('ascii')
+
+
+def _dhash(image_path: str) -> Optional[int]:
+    """
+    Compute a 64-bit difference hash of an image
+    
+    Args:
+        image_path: Path to image file
+        
+    Returns:
+        Hash as an int, or None if the image could not be read
+    """
+    try:
+        with Image.open(image_path) as image:
+            image.draft("L", (64, 64))  # JPEG frames decode at reduced scale
+            pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    except Exception as e:
+        print(f"Error hashing frame {image_path}: {e}")
+        return None
+    
+    # One bit per horizontally adjacent pixel pair: is the left one brighter?
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def _encode_frame(frame_path: str) -> Optional[Dict]:
+    """
+    Read a frame image and encode it as an image_url content part
+    
+    Args:
+        frame_path: Path to frame image
+        
+    Returns:
+        Content part, or None if the frame could not be read
+    """
+    try:
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": _file_to_b64(frame_path, _DATA_URL_PREFIX)
+            }
+        }
+    except Exception as e:
+        print(f"Error encoding frame {frame_path}: {e}")
+        return None
 
 
 class OpenAIHandler:
     """Handle OpenAI API operations"""
     
-    def __init__(self, api_key: str, model_name: str = "gpt-4o-mini"):
+    def __init__(self, api_key: str, model_name: str = "gpt-4o-mini", cache_dir: Optional[str] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         """
         Initialize OpenAI handler
         
         Args:
             api_key: OpenAI API key (or OpenRouter key)
             model_name: Model name to use (gpt-4o-mini, gpt-4o, gpt-3.5-turbo)
+            cache_dir: Optional directory for caching responses on disk
+            rate_limiter: Optional limiter shared by handlers using the same API key
         """
         # Check if using OpenRouter
         if api_key.startswith("sk-or-"):
             self.client = OpenAI(
                 api_key=api_key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url="https://openrouter.ai/api/v1",
+                max_retries=0  # Retries are handled by _call_with_budget
             )
             # Use OpenRouter model names
             if model_name == "gpt-4o-mini":
@@ -31,18 +157,70 @@ class OpenAIHandler:
             elif model_name == "gpt-4o":
                 model_name = "openai/gpt-4o"
         else:
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, max_retries=0)
         
         self.model_name = model_name
         
         # Generation config
         self.temperature = 0.7
         self.max_tokens = 2048  # Increased for more detailed responses
+        
+        # Identical requests are answered from disk instead of the API
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        
+        # Requests are throttled client-side instead of tripping 429s
+        self.rate_limiter = rate_limiter or RateLimiter()
+    
+    def _call_with_budget(self, max_attempts: int = _MAX_ATTEMPTS, **kwargs):
+        """
+        Create a chat completion within the rate budget, retrying transient errors
+        
+        Args:
+            max_attempts: Number of attempts before the last error is raised
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            Chat completion response
+        """
+        # Rough token estimate: ~4 characters per token plus the completion allowance
+        tokens = kwargs.get("max_tokens") or 0
+        for message in kwargs.get("messages", []):
+            content = message["content"]
+            if isinstance(content, str):
+                tokens += len(content) // 4
+            else:
+                tokens += sum(
+                    len(part["text"]) // 4 if part["type"] == "text" else _IMAGE_TOKEN_ESTIMATE
+                    for part in content
+                )
+        
+        for attempt in range(max_attempts):
+            self.rate_limiter.acquire(tokens)
+            try:
+                return self.client.chat.completions.create(**kwargs)
+            except _RETRYABLE_ERRORS as e:
+                if attempt == max_attempts - 1:
+                    raise
+                
+                # Honor the server's Retry-After (capped), otherwise back off exponentially with jitter
+                delay = min(2 ** attempt, _MAX_RETRY_DELAY) + random.random()
+                response = getattr(e, "response", None)
+                if response is not None:
+                    try:
+                        delay = float(response.headers.get("retry-after", delay))
+                    except ValueError:
+                        pass
+                delay = min(max(delay, 0.0), _MAX_RETRY_DELAY)
+                print(f"{type(e).__name__} from {kwargs.get('model')}, retrying in {delay:.1f}s")
+                time.sleep(delay)
     
     def generate_response(self, prompt: str, context: Optional[str] = None) -> str:
         """
         Generate response using OpenAI
         
+        Chat answers are sampled at self.temperature, so they are not cached:
+        replaying one would turn a sampled answer into a fixed one.
+        
         Args:
             prompt: User prompt/query
             context: Optional context to include
@@ -61,7 +239,7 @@ Please provide a comprehensive answer based on the context provided. If the cont
             else:
                 full_prompt = prompt
             
-            response = self.client.chat.completions.create(
+            response = self._call_with_budget(
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an exceptionally intelligent and helpful AI assistant. You have strong language understanding capabilities and can automatically interpret user questions even with spelling mistakes, typos, or grammatical errors. Always answer in clear, natural, conversational language that's easy to understand. Focus on being helpful and providing accurate information based on the provided context."},
@@ -75,21 +253,30 @@ Please provide a comprehensive answer based on the context provided. If the cont
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
-    def analyze_image(self, image_path: str, prompt: str) -> str:
+    def analyze_image(self, image_path: str, prompt: str, no_cache: bool = False) -> str:
         """
         Analyze image using vision model
         
         Args:
             image_path: Path to image file
             prompt: Question about the image
+            no_cache: Skip the response cache
             
         Returns:
             Analysis result
         """
         try:
-            # Load and encode image
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            cache_key = None
+            if self.cache and not no_cache:
+                cache_key = ResponseCache.make_key(
+                    "analyze_image", self.model_name, _IMAGE_SYSTEM_PROMPT, prompt, ResponseCache.file_digest(image_path)
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Load and encode image as a data URL
+            image_url = _file_to_b64(image_path, _DATA_URL_PREFIX)
             
             # Use appropriate vision model based on API
             if "openai/" in self.model_name or self.model_name.startswith("sk-or"):
@@ -99,9 +286,10 @@ Please provide a comprehensive answer based on the context provided. If the cont
             
             print(f"Analyzing image with model: {vision_model}")
             
-            response = self.client.chat.completions.create(
+            response = self._call_with_budget(
                 model=vision_model,
                 messages=[
+                    {"role": "system", "content": _IMAGE_SYSTEM_PROMPT},
                     {
                         "role": "user",
                         "content": [
@@ -109,7 +297,7 @@ Please provide a comprehensive answer based on the context provided. If the cont
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                    "url": image_url
                                 }
                             }
                         ]
@@ -120,6 +308,8 @@ Please provide a comprehensive answer based on the context provided. If the cont
             
             result = response.choices[0].message.content
             print(f"Image analysis successful: {len(result)} characters")
+            if cache_key and result:
+                self.cache.set(cache_key, result)
             return result
         except Exception as e:
             error_msg = f"Error analyzing image: {str(e)}"
@@ -137,20 +327,27 @@ Please provide a comprehensive answer based on the context provided. If the cont
         Returns:
             Video analysis result
         """
-        # Encode all frames
-        frame_images = []
-        for frame_path in frame_paths[:10]:  # Limit to 10 frames
-            try:
-                with open(frame_path, "rb") as image_file:
-                    base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-                    frame_images.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    })
-            except Exception as e:
-                print(f"Error encoding frame {frame_path}: {e}")
+        frame_paths = frame_paths[:10]  # Limit to 10 frames
+        if not frame_paths:
+            return "Error: No frames could be loaded for analysis"
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(frame_paths))) as executor:
+            # Drop near-duplicate frames (static scenes) before paying for their image tokens
+            kept_paths = []
+            kept_hashes = []
+            for frame_path, frame_hash in zip(frame_paths, executor.map(_dhash, frame_paths)):
+                if frame_hash is not None and any(
+                    bin(frame_hash ^ kept).count("1") <= _FRAME_HASH_DISTANCE for kept in kept_hashes
+                ):
+                    continue
+                kept_paths.append(frame_path)
+                if frame_hash is not None:
+                    kept_hashes.append(frame_hash)
+            if len(kept_paths) < len(frame_paths):
+                print(f"Skipping {len(frame_paths) - len(kept_paths)} near-duplicate video frames")
+            
+            # Encode the remaining frames concurrently, overlapping file reads with encoding
+            frame_images = [image for image in executor.map(_encode_frame, kept_paths) if image]
         
         if not frame_images:
             return "Error: No frames could be loaded for analysis"
@@ -165,51 +362,102 @@ Please provide a comprehensive answer based on the context provided. If the cont
         if not ("openai/" in self.model_name or self.model_name.startswith("sk-or")):
             vision_models = ["gpt-4o"]  # Use OpenAI's model directly
         
-        for vision_model in vision_models:
+        # Describe every frame concurrently - each request is network bound
+        frame_prompt = "Describe this video frame."
+        print(f"Analyzing {len(frame_images)} video frames in parallel")
+        with ThreadPoolExecutor(max_workers=min(8, len(frame_images))) as executor:
+            descriptions = list(executor.map(
+                lambda frame_image: self._describe_frame(frame_image, frame_prompt, vision_models),
+                frame_images
+            ))
+        
+        frame_descriptions = "\n\n".join(
+            f"Frame {i+1}: {description}"
+            for i, description in enumerate(descriptions) if description
+        )
+        if not frame_descriptions:
+            # All models failed
+            return "Error: All vision models failed to analyze the video. The service may be rate-limited. Please try again later or with fewer/shorter videos."
+        
+        # Synthesize the per-frame descriptions with a single text-only call
+        try:
+            synthesis_prompt = f"{prompt}\n\nThe video frames are described below in chronological order:\n\n{frame_descriptions}"
+            response = self._call_with_budget(
+                model=self.model_name,
+                messages=[
+                    {"role": "system", "content": _VIDEO_SYSTEM_PROMPT},
+                    {
+                        "role": "user",
+                        "content": synthesis_prompt
+                    }
+                ],
+                max_tokens=1000
+            )
+            
+            result = response.choices[0].message.content
+            print(f"Video analysis successful: {len(result)} characters")
+            return result
+        except Exception as e:
+            print(f"Error summarizing video frames: {str(e)}")
+            return frame_descriptions
+    
+    def _describe_frame(self, frame_image: Dict, prompt: str, vision_models: List[str]) -> Optional[str]:
+        """
+        Describe a single encoded video frame, trying each vision model in order
+        
+        Args:
+            frame_image: Encoded frame content part
+            prompt: Question about the frame
+            vision_models: Vision models to try
+            
+        Returns:
+            Frame description, or None if every model failed
+        """
+        for i, vision_model in enumerate(vision_models):
             try:
-                print(f"Analyzing {len(frame_images)} video frames with model: {vision_model}")
-                
-                # Build content with text prompt and all frames
-                content = [{"type": "text", "text": prompt}] + frame_images
-                
-                response = self.client.chat.completions.create(
+                # Fall through to the next model quickly instead of waiting out this one's rate limit
+                response = self._call_with_budget(
+                    max_attempts=_FALLBACK_ATTEMPTS if i < len(vision_models) - 1 else _MAX_ATTEMPTS,
                     model=vision_model,
                     messages=[
+                        {"role": "system", "content": _VIDEO_FRAME_SYSTEM_PROMPT},
                         {
                             "role": "user",
-                            "content": content
+                            "content": [{"type": "text", "text": prompt}, frame_image]
                         }
                     ],
-                    max_tokens=1000
+                    max_tokens=300
                 )
-                
-                result = response.choices[0].message.content
-                print(f"Video analysis successful with {vision_model}: {len(result)} characters")
-                return result
+                return response.choices[0].message.content
             except Exception as e:
-                error_msg = f"Error with {vision_model}: {str(e)}"
-                print(error_msg)
+                print(f"Error with {vision_model}: {str(e)}")
                 # Try next model
                 continue
-        
-        # All models failed
-        return "Error: All vision models failed to analyze the video. The service may be rate-limited. Please try again later or with fewer/shorter videos."
+        return None
     
-    def summarize_text(self, text: str, max_length: int = 200) -> str:
+    def summarize_text(self, text: str, max_length: int = 200, no_cache: bool = False) -> str:
         """
         Summarize long text
         
         Args:
             text: Text to summarize
             max_length: Maximum length of summary
+            no_cache: Skip the response cache
             
         Returns:
             Summary
         """
+        cache_key = None
+        if self.cache and not no_cache:
+            cache_key = ResponseCache.make_key("summarize_text", self.model_name, str(max_length), text)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
             prompt = f"Provide a concise summary of the following text in approximately {max_length} words:\n\n{text}"
             
-            response = self.client.chat.completions.create(
+            response = self._call_with_budget(
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that summarizes text concisely."},
@@ -219,7 +467,10 @@ Please provide a comprehensive answer based on the context provided. If the cont
                 max_tokens=max_length * 2
             )
             
-            return response.choices[0].message.content
+            result = response.choices[0].message.content
+            if cache_key and result:
+                self.cache.set(cache_key, result)
+            return result
         except Exception as e:
             return f"Error summarizing text: {str(e)}"
     
@@ -235,13 +486,31 @@ Please provide a comprehensive answer based on the context provided. If the cont
             Answer based on context
         """
         try:
-            # Combine context documents
-            combined_context = "\n\n".join(context_docs)
+            # Drop near-duplicate chunks (same opening text, ignoring case and whitespace)
+            seen = set()
+            unique_docs = []
+            for doc in context_docs:
+                signature = hash(" ".join(doc[:200].lower().split()))
+                if doc.strip() and signature not in seen:
+                    seen.add(signature)
+                    unique_docs.append(doc)
             
-            # Limit context length
+            # Most information-dense documents first: distinct words per character
+            unique_docs.sort(key=lambda doc: len(set(doc.split())) / len(doc), reverse=True)
+            
+            # Greedily fill the context budget, skipping documents that no longer fit
             max_context_chars = 4000
-            if len(combined_context) > max_context_chars:
-                combined_context = combined_context[:max_context_chars] + "..."
+            selected = []
+            used = 0
+            for doc in unique_docs:
+                size = len(doc.encode('utf-8')) + 2
+                if used + size <= max_context_chars:
+                    selected.append(doc)
+                    used += size
+            if not selected and unique_docs:
+                selected = [unique_docs[0][:max_context_chars] + "..."]
+            
+            combined_context = "\n\n".join(selected)
             
             return self.generate_response(question, combined_context)
         except Exception as e:
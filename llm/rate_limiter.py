@@ -0,0 +1,51 @@
+"""
+Client-side token-bucket throttling for LLM API requests
+"""
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Keep request and token throughput under per-minute limits"""
+    
+    def __init__(self, max_requests_per_minute: Optional[int] = None, max_tokens_per_minute: Optional[int] = None):
+        """
+        Initialize rate limiter
+        
+        Args:
+            max_requests_per_minute: Request budget per minute (None for unlimited)
+            max_tokens_per_minute: Token budget per minute (None for unlimited)
+        """
+        # Buckets start full and refill continuously at limit / 60 per second
+        self.limits = (max_requests_per_minute or 0, max_tokens_per_minute or 0)
+        self.available = [float(limit) for limit in self.limits]
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: int = 0):
+        """
+        Block until one request and the given number of tokens fit the budget
+        
+        Args:
+            tokens: Estimated tokens used by the request
+        """
+        # A request larger than a whole bucket only waits for the bucket to fill
+        costs = [min(cost, limit) for cost, limit in zip((1, tokens), self.limits)]
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                wait = 0.0
+                for i, limit in enumerate(self.limits):
+                    if not limit:
+                        continue
+                    self.available[i] = min(limit, self.available[i] + elapsed * limit / 60.0)
+                    wait = max(wait, (costs[i] - self.available[i]) * 60.0 / limit)
+                if wait <= 0:
+                    for i, limit in enumerate(self.limits):
+                        if limit:
+                            self.available[i] -= costs[i]
+                    return
+            time.sleep(wait)
@@ -0,0 +1,126 @@
+"""
+On-disk cache for LLM responses keyed by content hash
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Dict, Optional, Union
+
+# Writes per cache directory, shared by every ResponseCache on it; handlers are
+# created per session, so a per-instance count would rarely reach PRUNE_INTERVAL
+_WRITES: Dict[str, int] = {}
+_WRITES_LOCK = threading.Lock()
+
+
+class ResponseCache:
+    """Store LLM responses as files named by the SHA-256 of their inputs"""
+    
+    # How often (in writes) the cache is trimmed back to max_entries
+    PRUNE_INTERVAL = 64
+    
+    def __init__(self, cache_dir: str, max_entries: int = 10000):
+        """
+        Initialize response cache
+        
+        Args:
+            cache_dir: Directory holding cached responses
+            max_entries: Maximum number of cached responses kept on disk
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._writes_key = os.path.abspath(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(*parts: Union[str, bytes]) -> str:
+        """
+        Build a cache key from the inputs of an LLM call
+        
+        Args:
+            *parts: Strings or bytes identifying the request
+            
+        Returns:
+            Hex digest key
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part.encode('utf-8') if isinstance(part, str) else part
+            # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def file_digest(path: str) -> bytes:
+        """
+        Hash a file's contents
+        
+        Args:
+            path: Path to file
+            
+        Returns:
+            SHA-256 digest of the file
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.digest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            Cached response, or None on a miss
+        """
+        path = os.path.join(self.cache_dir, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = f.read()
+            # Mark as recently used for pruning
+            os.utime(path)
+            return value
+        except OSError:
+            return None
+    
+    def set(self, key: str, value: str):
+        """
+        Store a response
+        
+        Args:
+            key: Cache key
+            value: Response to cache
+        """
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp_path, os.path.join(self.cache_dir, key))
+        except OSError as e:
+            print(f"Error writing LLM cache entry: {e}")
+            return
+        
+        with _WRITES_LOCK:
+            writes = _WRITES.get(self._writes_key, 0) + 1
+            _WRITES[self._writes_key] = writes
+            prune = writes % self.PRUNE_INTERVAL == 0
+        if prune:
+            self._prune()
+    
+    def _prune(self):
+        """Delete the least recently used responses beyond max_entries"""
+        try:
+            with os.scandir(self.cache_dir) as it:
+                entries = [entry for entry in it if entry.is_file() and not entry.name.endswith('.tmp')]
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_entries]:
+                os.remove(entry.path)
+        except OSError as e:
+            print(f"Error pruning LLM cache: {e}")
@@ -4,7 +4,12 @@ Image processor for PNG, JPG files
 import os
 from typing import Dict
 from PIL import Image
-import io
+
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
 
 
 class ImageProcessor:
@@ -19,37 +24,32 @@ class ImageProcessor:
             file_path: Path to the image file
             
         Returns:
-            Dictionary with image info and data
+            Dictionary with image info and metadata
         """
         try:
             file_name = os.path.basename(file_path)
             file_ext = os.path.splitext(file_path)[1].lower()
             
-            # Open and validate image
-            image = Image.open(file_path)
-            
-            # Get image metadata
-            width, height = image.size
-            format_type = image.format
-            mode = image.mode
-            
-            # Convert image to bytes for API calls
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format=format_type)
-            img_byte_arr = img_byte_arr.getvalue()
+            # Open and validate image - size, format and mode come from the
+            # header, so the pixel data is never decoded
+            with Image.open(file_path) as image:
+                width, height = image.size
+                format_type = image.format
+                mode = image.mode
+                metadata = {
+                    "width": width,
+                    "height": height,
+                    "format": format_type,
+                    "mode": mode
+                }
             
+            # The LLM handlers encode straight from file_path, so the bytes are not read here
             return {
                 "file_name": file_name,
                 "file_type": file_ext[1:],
                 "content": file_path,  # Store path for later use
                 "content_type": "image",
-                "metadata": {
-                    "width": width,
-                    "height": height,
-                    "format": format_type,
-                    "mode": mode
-                },
-                "image_data": img_byte_arr
+                "metadata": metadata
             }
         except Exception as e:
             raise Exception(f"Error processing image: {str(e)}")
@@ -66,12 +66,12 @@ class ImageProcessor:
         Returns:
             Extracted text
         """
+        if not PYTESSERACT_AVAILABLE:
+            return "[OCR not available - tesseract not installed]"
+        
         try:
-            import pytesseract
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
+            with Image.open(file_path) as image:
+                text = pytesseract.image_to_string(image)
             return text.strip()
-        except ImportError:
-            return "[OCR not available - tesseract not installed]"
         except Exception as e:
             return f"[Error extracting text from image: {str(e)}]"
@@ -1,10 +1,38 @@
 """
 Media processor for MP3, MP4, and YouTube videos
 """
+import functools
+import glob
 import os
-from typing import Dict
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional
 import tempfile
 
+import httpx
+import numpy as np
+from openai import OpenAI
+from PIL import Image
+
+from config import OPENAI_API_KEY
+
+# Concurrent Whisper requests per file
+WHISPER_MAX_WORKERS = 5
+
+# Formats the Whisper API accepts without conversion
+WHISPER_FORMATS = {'.flac', '.m4a', '.mp3', '.mp4', '.mpeg', '.mpga', '.oga', '.ogg', '.wav', '.webm'}
+
+# Threads encoding extracted video frames to JPEG
+FRAME_SAVE_WORKERS = 4
+
+# One Whisper client per process so keep-alive connections survive across chunks and files
+_WHISPER_CLIENT = None
+_WHISPER_CLIENT_LOCK = threading.Lock()
+
 # Optional imports with fallbacks
 try:
     import speech_recognition as sr
@@ -18,6 +46,25 @@ try:
 except ImportError:
     MOVIEPY_AVAILABLE = False
 
+try:
+    import imageio_ffmpeg
+    IMAGEIO_FFMPEG_AVAILABLE = True
+except ImportError:
+    IMAGEIO_FFMPEG_AVAILABLE = False
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _TURBOJPEG = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except Exception:  # ImportError, or libjpeg-turbo itself is missing
+    TURBOJPEG_AVAILABLE = False
+
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
 try:
     import yt_dlp
     YT_DLP_AVAILABLE = True
@@ -25,6 +72,28 @@ except ImportError:
     YT_DLP_AVAILABLE = False
 
 
+def _save_jpeg(frame: np.ndarray, frame_path: str):
+    """Save an RGB video frame as JPEG with libjpeg-turbo, falling back to PIL"""
+    if TURBOJPEG_AVAILABLE:
+        with open(frame_path, 'wb') as f:
+            f.write(_TURBOJPEG.encode(np.ascontiguousarray(frame), quality=85, pixel_format=TJPF_RGB))
+    else:
+        # Single Huffman pass, no optimize
+        Image.fromarray(frame).save(frame_path, 'JPEG', quality=85, optimize=False)
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_binary() -> Optional[str]:
+    """Locate ffmpeg on PATH, falling back to the binary bundled with imageio-ffmpeg"""
+    path = shutil.which("ffmpeg")
+    if path is None and IMAGEIO_FFMPEG_AVAILABLE:
+        try:
+            path = imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            path = None
+    return path
+
+
 class MediaProcessor:
     """Process audio and video files"""
     
@@ -39,61 +108,147 @@ class MediaProcessor:
         Returns:
             Path to extracted audio file
         """
-        if not MOVIEPY_AVAILABLE:
-            raise Exception("moviepy is not installed. Install it with: pip install moviepy")
+        ffmpeg = _ffmpeg_binary()
+        if ffmpeg is None:
+            raise Exception("ffmpeg is not installed. Install it or run: pip install imageio-ffmpeg")
         
         try:
-            video = VideoFileClip(video_path)
-            audio = video.audio
-            
-            # Create temp audio file
+            # Create temp audio file - mono, 16kHz PCM is all speech recognition needs
             audio_path = video_path.rsplit('.', 1)[0] + '_audio.wav'
-            audio.write_audiofile(audio_path, logger=None)
-            
-            video.close()
-            audio.close()
+            subprocess.run(
+                [ffmpeg, '-y', '-loglevel', 'error', '-i', video_path,
+                 '-vn', '-ac', '1', '-ar', '16000', '-c:a', 'pcm_s16le', audio_path],
+                check=True, capture_output=True
+            )
             
             return audio_path
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Error extracting audio from video: {e.stderr.decode(errors='replace').strip()}")
         except Exception as e:
             raise Exception(f"Error extracting audio from video: {str(e)}")
     
     @staticmethod
-    def split_audio_into_chunks(audio_path: str, chunk_duration_seconds: int = 60) -> list:
+    def split_audio_into_chunks(audio_path: str, chunk_duration_seconds: int = 60, for_whisper: bool = False) -> list:
         """
         Split audio file into smaller chunks (default 60 seconds)
         
         Args:
             audio_path: Path to audio file
             chunk_duration_seconds: Duration of each chunk in seconds
+            for_whisper: Write FLAC chunks (lossless, roughly half the upload size) instead of WAV
             
         Returns:
             List of chunk file paths
         """
-        if not MOVIEPY_AVAILABLE:
+        # Short WAV files fit in a single chunk - the header alone gives the duration
+        if audio_path.lower().endswith('.wav'):
+            try:
+                with wave.open(audio_path, 'rb') as wav_file:
+                    if wav_file.getnframes() / wav_file.getframerate() <= chunk_duration_seconds:
+                        return [audio_path]
+            except (wave.Error, EOFError):
+                pass
+        
+        ffmpeg = _ffmpeg_binary()
+        if ffmpeg is None:
             return [audio_path]
         
         try:
-            from moviepy import AudioFileClip
-            audio = AudioFileClip(audio_path)
-            duration = audio.duration
-            
-            chunks = []
-            chunk_index = 0
-            for i in range(0, int(duration), chunk_duration_seconds):
-                end_time = min(i + chunk_duration_seconds, duration)
-                chunk = audio.subclipped(i, end_time)
-                chunk_path = audio_path.rsplit('.', 1)[0] + f'_chunk_{chunk_index}.wav'
-                # Use mono, 16kHz to minimize file size
-                chunk.write_audiofile(chunk_path, logger=None, fps=16000, nbytes=2, codec='pcm_s16le')
-                chunks.append(chunk_path)
-                chunk_index += 1
-            
-            audio.close()
-            return chunks
+            # Whisper accepts FLAC; local speech recognition needs PCM WAV
+            codec, extension = ('flac', '.flac') if for_whisper else ('pcm_s16le', '.wav')
+            base = audio_path.rsplit('.', 1)[0] + '_chunk_'
+            for stale_path in glob.glob(glob.escape(base) + '*' + extension):
+                os.remove(stale_path)
+            
+            # One ffmpeg pass writes every chunk - mono, 16kHz to minimize file size
+            subprocess.run(
+                [ffmpeg, '-y', '-loglevel', 'error', '-i', audio_path,
+                 '-f', 'segment', '-segment_time', str(chunk_duration_seconds),
+                 '-ac', '1', '-ar', '16000', '-c:a', codec, base + '%d' + extension],
+                check=True, capture_output=True
+            )
+            
+            chunks = glob.glob(glob.escape(base) + '*' + extension)
+            chunks.sort(key=lambda path: int(path[len(base):-len(extension)]))
+            return chunks or [audio_path]
         except Exception as e:
             print(f"Error splitting audio: {e}")
             return [audio_path]
     
+    @staticmethod
+    def _get_whisper_client(api_key: str):
+        """
+        Get the process-wide OpenAI client used for Whisper requests
+        
+        Args:
+            api_key: OpenAI API key
+            
+        Returns:
+            OpenAI client with a pooled HTTP connection
+        """
+        global _WHISPER_CLIENT
+        with _WHISPER_CLIENT_LOCK:
+            if _WHISPER_CLIENT is None:
+                _WHISPER_CLIENT = OpenAI(
+                    api_key=api_key,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                        timeout=httpx.Timeout(600.0, connect=10.0)
+                    )
+                )
+            return _WHISPER_CLIENT
+    
+    @staticmethod
+    def _transcribe_one(client, chunk_path: str, model: str, attempts: int = 3) -> Optional[str]:
+        """
+        Transcribe one audio chunk with Whisper, retrying with exponential backoff
+        
+        Args:
+            client: OpenAI client
+            chunk_path: Path to audio chunk
+            model: Whisper model name
+            attempts: Maximum number of attempts
+            
+        Returns:
+            Transcribed text, or None if every attempt failed
+        """
+        for attempt in range(attempts):
+            try:
+                with open(chunk_path, "rb") as audio_file:
+                    transcript = client.audio.transcriptions.create(
+                        model=model,
+                        file=audio_file,
+                        response_format="text"
+                    )
+                print(f"Successfully transcribed chunk: {os.path.basename(chunk_path)}")
+                return transcript
+            except Exception as chunk_error:
+                print(f"Error transcribing chunk {chunk_path} (attempt {attempt + 1}/{attempts}): {chunk_error}")
+                if attempt < attempts - 1:
+                    time.sleep(2 ** attempt)
+        return None
+    
+    @staticmethod
+    def _convert_to_wav(audio_path: str) -> str:
+        """
+        Convert audio to mono 16kHz WAV for size checking and speech recognition
+        
+        Args:
+            audio_path: Path to audio file
+            
+        Returns:
+            Path to WAV file (the input path if conversion is unavailable)
+        """
+        if not MOVIEPY_AVAILABLE:
+            return audio_path
+        
+        audio = AudioFileClip(audio_path)
+        wav_path = audio_path.rsplit('.', 1)[0] + '_temp.wav'
+        # Use mono, 16kHz to reduce file size (perfect for speech recognition)
+        audio.write_audiofile(wav_path, logger=None, fps=16000, nbytes=2, codec='pcm_s16le')
+        audio.close()
+        return wav_path
+    
     @staticmethod
     def transcribe_audio(audio_path: str) -> str:
         """
@@ -106,23 +261,16 @@ class MediaProcessor:
             Transcribed text
         """
         try:
-            # Convert to WAV first if needed (for proper size checking and compatibility)
+            # Whisper takes compressed formats directly; only convert when WAV is needed
             wav_path = audio_path
-            if not audio_path.endswith('.wav'):
-                if MOVIEPY_AVAILABLE:
-                    from moviepy import AudioFileClip
-                    audio = AudioFileClip(audio_path)
-                    wav_path = audio_path.rsplit('.', 1)[0] + '_temp.wav'
-                    # Use mono, 16kHz to reduce file size (perfect for speech recognition)
-                    audio.write_audiofile(wav_path, logger=None, fps=16000, nbytes=2, codec='pcm_s16le')
-                    audio.close()
+            extension = os.path.splitext(audio_path)[1].lower()
+            whisper_ready = OPENAI_API_KEY and not OPENAI_API_KEY.startswith("sk-or-") and extension in WHISPER_FORMATS
+            if extension != '.wav' and not whisper_ready:
+                wav_path = MediaProcessor._convert_to_wav(audio_path)
             
             # Try OpenAI Whisper first (more reliable than Google Speech Recognition)
-            from config import OPENAI_API_KEY
             if OPENAI_API_KEY:
                 try:
-                    from openai import OpenAI
-                    
                     # OpenRouter doesn't support Whisper API, so use OpenAI directly
                     # If using OpenRouter key, skip Whisper and go straight to Google Speech
                     if OPENAI_API_KEY.startswith("sk-or-"):
@@ -130,7 +278,7 @@ class MediaProcessor:
                         raise Exception("OpenRouter not compatible with Whisper")
                     
                     # Use OpenAI Whisper
-                    client = OpenAI(api_key=OPENAI_API_KEY)
+                    client = MediaProcessor._get_whisper_client(OPENAI_API_KEY)
                     model = "whisper-1"
                     
                     # Check file size - if > 20MB, split into chunks
@@ -138,29 +286,29 @@ class MediaProcessor:
                     
                     if file_size_mb > 20:
                         print(f"Audio file is {file_size_mb:.2f}MB, splitting into 1-minute chunks...")
-                        chunks = MediaProcessor.split_audio_into_chunks(wav_path, chunk_duration_seconds=60)
-                        transcripts = []
+                        chunks = MediaProcessor.split_audio_into_chunks(wav_path, chunk_duration_seconds=60, for_whisper=True)
+                        
+                        # Transcribe chunks concurrently and reassemble them in order
+                        results = {}
+                        with ThreadPoolExecutor(max_workers=WHISPER_MAX_WORKERS) as executor:
+                            futures = {
+                                executor.submit(MediaProcessor._transcribe_one, client, chunk_path, model): i
+                                for i, chunk_path in enumerate(chunks)
+                            }
+                            for future in as_completed(futures):
+                                transcript = future.result()
+                                if transcript:
+                                    results[futures[future]] = transcript
                         
+                        # Clean up chunk files
                         for chunk_path in chunks:
-                            try:
-                                with open(chunk_path, "rb") as audio_file:
-                                    transcript = client.audio.transcriptions.create(
-                                        model=model,
-                                        file=audio_file,
-                                        response_format="text"
-                                    )
-                                    transcripts.append(transcript)
-                                    print(f"Successfully transcribed chunk: {os.path.basename(chunk_path)}")
-                            except Exception as chunk_error:
-                                print(f"Error transcribing chunk {chunk_path}: {chunk_error}")
-                            
-                            # Clean up chunk file
                             if chunk_path != wav_path:
                                 try:
                                     os.remove(chunk_path)
                                 except:
                                     pass
                         
+                        transcripts = [results[i] for i in sorted(results)]
                         if transcripts:
                             full_transcript = " ".join(transcripts)
                             print(f"Successfully transcribed {len(transcripts)} chunks, total length: {len(full_transcript)} characters")
@@ -182,6 +330,10 @@ class MediaProcessor:
             if not SPEECH_RECOGNITION_AVAILABLE:
                 return "[Speech recognition not available. Install with: pip install SpeechRecognition]"
             
+            # Google Speech Recognition needs PCM WAV
+            if not wav_path.lower().endswith('.wav'):
+                wav_path = MediaProcessor._convert_to_wav(audio_path)
+            
             recognizer = sr.Recognizer()
             
             # For large files, split and transcribe in chunks
@@ -247,32 +399,78 @@ class MediaProcessor:
         Returns:
             List of frame file paths
         """
+        if AV_AVAILABLE:
+            try:
+                return MediaProcessor._extract_frames_av(video_path, num_frames)
+            except Exception as e:
+                print(f"PyAV frame extraction failed: {e}, falling back to moviepy")
+        
         if not MOVIEPY_AVAILABLE:
             return []
         
         try:
-            from moviepy import VideoFileClip
             video = VideoFileClip(video_path)
-            duration = video.duration
             
             # Extract frames evenly distributed across the video
-            frame_paths = []
-            for i in range(num_frames):
-                time = (i * duration) / num_frames
-                frame = video.get_frame(time)
-                
-                # Save frame as JPEG
-                frame_path = video_path.rsplit('.', 1)[0] + f'_frame_{i}.jpg'
-                from PIL import Image
-                Image.fromarray(frame).save(frame_path, 'JPEG', quality=85)
-                frame_paths.append(frame_path)
-            
+            frames = [video.get_frame(t) for t in np.linspace(0, video.duration, num_frames, endpoint=False)]
             video.close()
+            
+            # Save frames as JPEG concurrently - libjpeg releases the GIL while encoding
+            base = video_path.rsplit('.', 1)[0]
+            frame_paths = [f'{base}_frame_{i}.jpg' for i in range(len(frames))]
+            with ThreadPoolExecutor(max_workers=FRAME_SAVE_WORKERS) as executor:
+                list(executor.map(_save_jpeg, frames, frame_paths))
             return frame_paths
         except Exception as e:
             print(f"Error extracting video frames: {e}")
             return []
     
+    @staticmethod
+    def _extract_frames_av(video_path: str, num_frames: int) -> list:
+        """
+        Extract frames with PyAV by seeking to the nearest keyframe
+        
+        Only keyframes are decoded, so each frame costs one short seek
+        instead of decoding the video up to the timestamp.
+        
+        Args:
+            video_path: Path to video file
+            num_frames: Number of frames to extract
+            
+        Returns:
+            List of frame file paths
+        """
+        base = video_path.rsplit('.', 1)[0]
+        frame_paths = []
+        with av.open(video_path) as container, ThreadPoolExecutor(max_workers=FRAME_SAVE_WORKERS) as executor:
+            stream = container.streams.video[0]
+            stream.codec_context.skip_frame = "NONKEY"
+            
+            if stream.duration is not None:
+                duration = float(stream.duration * stream.time_base)
+            elif container.duration is not None:
+                duration = container.duration / av.time_base
+            else:
+                raise Exception("Video duration is unknown")
+            
+            # Extract frames evenly distributed across the video
+            saves = []
+            for i, timestamp in enumerate(np.linspace(0, duration, num_frames, endpoint=False)):
+                container.seek(int(timestamp / stream.time_base), stream=stream)
+                frame = next(container.decode(stream), None)
+                if frame is None:
+                    continue
+                
+                # Save frame as JPEG in the background while seeking to the next one
+                frame_path = f'{base}_frame_{i}.jpg'
+                saves.append(executor.submit(_save_jpeg, frame.to_ndarray(format='rgb24'), frame_path))
+                frame_paths.append(frame_path)
+            
+            for save in saves:
+                save.result()
+        
+        return frame_paths
+    
     @staticmethod
     def process_audio(file_path: str) -> Dict:
         """
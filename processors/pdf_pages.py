@@ -0,0 +1,105 @@
+"""
+Page-by-page PDF text extraction, also runnable as a standalone worker process
+
+Run as a script, this module writes the page count and the text of a page
+range to stdout as length-prefixed frames. It is executed by file path so
+the child process only imports a PDF library, not the processors package.
+"""
+import os
+import struct
+import sys
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+    from pypdf import PdfReader
+
+# Frame header: kind byte and UTF-8 payload length
+FRAME_HEADER = struct.Struct('>BI')
+FRAME_COUNT = 0
+FRAME_PAGE = 1
+FRAME_ERROR = 2
+FRAME_KINDS = (FRAME_COUNT, FRAME_PAGE, FRAME_ERROR)
+# Upper bound on one frame's payload; anything larger is a corrupted header
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+
+@contextmanager
+def open_pdf(file_path: str) -> Iterator[Tuple[int, Callable[[int], str]]]:
+    """
+    Open a PDF with PyMuPDF (C parser, plain "text" mode skips layout analysis), else pypdf
+    
+    Args:
+        file_path: Path to the PDF file
+    
+    Yields:
+        Tuple of (page count, function returning the text of a page index)
+    """
+    if PYMUPDF_AVAILABLE:
+        with pymupdf.open(file_path) as doc:
+            yield len(doc), lambda i: doc[i].get_text("text")
+    else:
+        with open(file_path, 'rb') as file:
+            pages = PdfReader(file, strict=False).pages
+            yield len(pages), lambda i: pages[i].extract_text() or ""
+
+
+def iter_pdf_pages(file_path: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of PDF pages [start, end)
+    
+    Args:
+        file_path: Path to the PDF file
+        start: Index of the first page
+        end: Index after the last page (None for the end of the document)
+    
+    Yields:
+        Text of each page
+    """
+    with open_pdf(file_path) as (page_count, page_text):
+        for i in range(start, page_count if end is None else min(end, page_count)):
+            yield page_text(i)
+
+
+def _write_frame(stream: BinaryIO, kind: int, text: str):
+    """Write one length-prefixed frame and flush it to the reader"""
+    payload = text.encode('utf-8', 'surrogatepass')
+    stream.write(FRAME_HEADER.pack(kind, len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def write_pdf_pages(file_path: str, start: int, end: Optional[int], stream: BinaryIO):
+    """
+    Write the page count, then one frame per page of [start, end)
+    
+    A failure is reported as a final error frame instead of a traceback.
+    
+    Args:
+        file_path: Path to the PDF file
+        start: Index of the first page
+        end: Index after the last page (None for the end of the document)
+        stream: Binary stream to write frames to
+    """
+    try:
+        with open_pdf(file_path) as (page_count, page_text):
+            _write_frame(stream, FRAME_COUNT, str(page_count))
+            for i in range(start, page_count if end is None else min(end, page_count)):
+                _write_frame(stream, FRAME_PAGE, page_text(i))
+    except Exception as e:
+        _write_frame(stream, FRAME_ERROR, str(e))
+
+
+if __name__ == "__main__":
+    # Usage: pdf_pages.py FILE START [END]
+    # Frames go to a private copy of stdout; fd 1 itself is pointed at stderr so
+    # MuPDF warnings and stray prints cannot interleave with the frame stream
+    frames = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    with frames:
+        write_pdf_pages(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]) if len(sys.argv) > 3 else None, frames)
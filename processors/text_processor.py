@@ -1,27 +1,445 @@
 """
 Text file processor for PDF, DOCX, PPTX, MD, TXT files
 """
+import hashlib
+import functools
+import html
+import mmap
 import os
-from typing import List, Dict
-import PyPDF2
-from docx import Document
-from pptx import Presentation
-import markdown
+import queue
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional
+
+from config import CHUNK_TOKENIZER, CHUNK_TOKEN_SIZE, CHUNK_TOKEN_OVERLAP
+from processors import pdf_pages
+from utils.chunking import chunk_offsets, chunk_text_tokens
+from utils.file_handler import file_extension
+
+try:
+    import cmarkgfm
+    from cmarkgfm.cmark import Options as CmarkOptions
+    CMARKGFM_AVAILABLE = True
+except ImportError:
+    CMARKGFM_AVAILABLE = False
+
+try:
+    from isal import isal_zlib
+    ISAL_AVAILABLE = True
+except ImportError:
+    ISAL_AVAILABLE = False
+
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    TOKENIZERS_AVAILABLE = False
+
+# Markdown syntax stripped by _strip_markdown, compiled once at import
+_MD_CODE_FENCE = re.compile(r'^\s{0,3}(?:```|~~~).*$', re.MULTILINE)
+# Only tag-shaped text on one line; a bare '<' or '>' in prose is left alone
+_MD_HTML_TAG = re.compile(r'</?[A-Za-z][^<>\n]*>')
+# Tags in cmark's rendered HTML, where every literal '<' is already escaped
+_HTML_TAG = re.compile(r'<[^>]*>')
+_MD_BLANK_LINES = re.compile(r'\n{3,}')
+_MD_IMAGE = re.compile(r'!\[([^\]]*)\]\([^)]*\)')
+_MD_LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+_MD_HORIZONTAL_RULE = re.compile(r'^\s{0,3}([-*_])(?:\s*\1){2,}\s*$', re.MULTILINE)
+_MD_LINE_PREFIX = re.compile(r'^\s{0,3}(?:#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)', re.MULTILINE)
+# Inline markers are removed only in matching pairs, so "2*3*4" and snake_case survive
+_MD_CODE_SPAN = re.compile(r'(`+)(.+?)\1')
+_MD_EMPHASIS = re.compile(r'(?<![\w*])(\*{1,3}|_{1,3})(?=\S)(.+?)(?<=\S)\1(?![\w*])')
+_MD_STRIKETHROUGH = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~')
+
+
+def _read_text(file_path: str) -> str:
+    """Decode a UTF-8 text file straight from a memory map, without a bytes copy"""
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = str(mm, 'utf-8')
+    # Match text-mode reads, which translate Windows/old Mac line endings
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _strip_markdown(md_text: str) -> str:
+    """Reduce Markdown source to plain text"""
+    if CMARKGFM_AVAILABLE:
+        # cmark parses and renders in C; rendered text escapes '<', so only real tags are stripped.
+        # Unsafe mode passes raw HTML blocks through instead of omitting them, keeping their text.
+        rendered = cmarkgfm.github_flavored_markdown_to_html(md_text, options=CmarkOptions.CMARK_OPT_UNSAFE)
+        return html.unescape(_MD_BLANK_LINES.sub('\n\n', _HTML_TAG.sub('', rendered)))
+    
+    # Pure-Python fallback: strip the syntax without rendering to HTML
+    text = _MD_CODE_FENCE.sub('', md_text)
+    text = _MD_HTML_TAG.sub('', text)
+    text = _MD_IMAGE.sub(r'\1', text)
+    text = _MD_LINK.sub(r'\1', text)
+    text = _MD_HORIZONTAL_RULE.sub('', text)
+    text = _MD_LINE_PREFIX.sub('', text)
+    text = _MD_CODE_SPAN.sub(r'\2', text)
+    text = _MD_EMPHASIS.sub(r'\2', text)
+    return _MD_STRIKETHROUGH.sub(r'\1', text)
+
+
+# WordprocessingML elements read by process_docx
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_PARAGRAPH = _W_NS + 'p'
+_W_RUN = _W_NS + 'r'
+_W_TEXT = _W_NS + 't'
+_W_BREAK = _W_NS + 'br'
+_W_BREAK_TYPE = _W_NS + 'type'
+# Run children rendered as whitespace, matching python-docx's paragraph.text
+_W_RUN_WHITESPACE = {_W_NS + 'tab': '\t', _W_NS + 'cr': '\n'}
+
+# PresentationML/DrawingML names read by process_pptx
+_A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_A_PARAGRAPH = _A_NS + 'p'
+_A_TEXT = _A_NS + 't'
+_P_SLIDE_ID = '{http://schemas.openxmlformats.org/presentationml/2006/main}sldId'
+_R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+_SLIDE_NAME = re.compile(r'ppt/slides/slide(\d+)\.xml')
+
+# Threads decompressing slides of one presentation
+PPTX_WORKERS = 8
+
+
+def _read_zip_member(archive_path: str, info: zipfile.ZipInfo) -> bytes:
+    """
+    Read one archive member, inflating with ISA-L when available
+    
+    Each call opens the archive itself, so members can be read from
+    several threads at once; both zlib and ISA-L release the GIL while
+    inflating.
+    
+    Args:
+        archive_path: Path to the zip archive
+        info: Member to read
+        
+    Returns:
+        Decompressed member contents
+    """
+    if ISAL_AVAILABLE and info.compress_type == zipfile.ZIP_DEFLATED:
+        with open(archive_path, 'rb') as f:
+            # Skip the local file header to reach the raw deflate stream
+            f.seek(info.header_offset)
+            name_length, extra_length = struct.unpack('<26xHH', f.read(30))
+            f.seek(name_length + extra_length, os.SEEK_CUR)
+            data = isal_zlib.decompress(f.read(info.compress_size), wbits=-15)
+        if isal_zlib.crc32(data) != info.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+        return data
+    
+    with zipfile.ZipFile(archive_path) as archive:
+        return archive.read(info)
+
+
+def _slide_text(xml: bytes) -> str:
+    """Extract the text of one slide, one line per DrawingML paragraph"""
+    paragraphs = []
+    for paragraph in ET.fromstring(xml).iter(_A_PARAGRAPH):
+        text = "".join(run.text or "" for run in paragraph.iter(_A_TEXT))
+        if text:
+            paragraphs.append(text)
+    return "\n".join(paragraphs)
+
+
+def _slide_names(archive: zipfile.ZipFile) -> List[str]:
+    """List slide part names in presentation order, falling back to file-name order"""
+    try:
+        relationships = ET.fromstring(archive.read('ppt/_rels/presentation.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target') for rel in relationships.iter(_REL)}
+        presentation = ET.fromstring(archive.read('ppt/presentation.xml'))
+        names = [
+            'ppt/' + targets[slide.get(_R_ID)].lstrip('/').removeprefix('ppt/')
+            for slide in presentation.iter(_P_SLIDE_ID)
+        ]
+        if names:
+            return names
+    except (KeyError, ET.ParseError):
+        pass
+    slides = [name for name in archive.namelist() if _SLIDE_NAME.fullmatch(name)]
+    return sorted(slides, key=lambda name: int(_SLIDE_NAME.fullmatch(name).group(1)))
+
+
+# Formats whose extraction is CPU-bound parsing (processes) vs. plain reads (threads)
+PROCESS_POOL_EXTENSIONS = {'.pdf', '.docx', '.pptx'}
+THREAD_POOL_WORKERS = 8
+
+# Poppler's pdftotext, used when PyMuPDF is not installed
+PDFTOTEXT_PATH = shutil.which('pdftotext')
+
+# Rough bytes per PDF page, used to size the whole-document pdftotext timeout
+PDF_BYTES_PER_PAGE_ESTIMATE = 64 * 1024
+
+# Per-page extraction budget; a page over it is skipped with a marker instead of hanging the upload
+PDF_MAX_SECONDS_PER_PAGE = 30.0
+_PDF_SKIPPED_MARKER = "[Page {} skipped: text extraction {}]"
+_PDF_SKIPPED_PAGE = re.compile(r'\[Page \d+ skipped: text extraction (?:timed out|crashed|failed)\]')
+
+
+# Worker script for bounded extraction, run by path so the child skips the processors package imports
+_PDF_PAGES_SCRIPT = os.path.abspath(pdf_pages.__file__)
+
+
+# Queued by _read_frames when the worker's output is not a well-formed frame stream
+_FRAME_INVALID = -1
+
+
+def _read_frames(stream, frames: queue.Queue):
+    """
+    Forward frames from a pdf_pages worker's stdout to a queue
+    
+    Ends with None on a clean end of stream, or with an _FRAME_INVALID frame
+    if the stream is truncated mid-frame or does not parse as frames.
+    """
+    with stream:
+        while True:
+            header = stream.read(pdf_pages.FRAME_HEADER.size)
+            if not header:
+                frames.put(None)
+                return
+            if len(header) < pdf_pages.FRAME_HEADER.size:
+                break
+            kind, length = pdf_pages.FRAME_HEADER.unpack(header)
+            if kind not in pdf_pages.FRAME_KINDS or length > pdf_pages.MAX_FRAME_SIZE:
+                break
+            payload = stream.read(length)
+            if len(payload) < length:
+                break
+            try:
+                frames.put((kind, payload.decode('utf-8', 'surrogatepass')))
+            except UnicodeDecodeError:
+                break
+    frames.put((_FRAME_INVALID, ''))
+
+
+def _extract_pdf_pages_bounded(file_path: str, max_seconds_per_page: Optional[float],
+                               start: int = 0, end: Optional[int] = None) -> List[str]:
+    """
+    Extract PDF page texts in a child process, giving up on any page that takes too long
+    
+    Pages are extracted by processors/pdf_pages.py and read back from its
+    stdout. A child stuck on (or crashed by) a pathological page is killed
+    and a fresh one resumes from the following page, so no PDF parser state
+    outlives a timeout in this process.
+    
+    Args:
+        file_path: Path to the PDF file
+        max_seconds_per_page: Seconds to wait for each page (None waits indefinitely)
+        start: Index of the first page
+        end: Index after the last page (None for the end of the document)
+        
+    Returns:
+        Page texts, with a marker in place of every skipped page
+    """
+    file_path = os.path.abspath(file_path)
+    parts = []
+    page = start
+    while end is None or page < end:
+        command = [sys.executable, _PDF_PAGES_SCRIPT, file_path, str(page)]
+        if end is not None:
+            command.append(str(end))
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+        frames = queue.Queue()
+        threading.Thread(target=_read_frames, args=(process.stdout, frames), daemon=True).start()
+        counted = False
+        try:
+            while True:
+                try:
+                    frame = frames.get(timeout=max_seconds_per_page)
+                except queue.Empty:
+                    reason = 'timed out'
+                    break
+                if frame is None:
+                    # A clean exit must have delivered every page it was asked for
+                    if process.wait() == 0 and counted and page >= end:
+                        return parts
+                    reason = 'crashed' if process.returncode else 'failed'
+                    break
+                kind, text = frame
+                if kind == _FRAME_INVALID:
+                    # Never trust a garbled stream's end as the end of the document
+                    reason = 'failed'
+                    break
+                if kind == pdf_pages.FRAME_ERROR:
+                    raise Exception(text)
+                if kind == pdf_pages.FRAME_COUNT:
+                    counted = True
+                    end = int(text) if end is None else min(end, int(text))
+                else:
+                    parts.append(text)
+                    page += 1
+        finally:
+            process.kill()
+            process.wait()
+        if not counted:
+            raise Exception(f"PDF could not be opened (extraction {reason})")
+        print(f"PDF page {page + 1} of {file_path}: extraction {reason}, skipping it")
+        parts.append(_PDF_SKIPPED_MARKER.format(page + 1, reason))
+        page += 1
+    return parts
+
+
+def _pdf_page_count(file_path: str, timeout: Optional[float]) -> int:
+    """Count the pages of a PDF in a pdf_pages child process"""
+    result = subprocess.run(
+        [sys.executable, _PDF_PAGES_SCRIPT, os.path.abspath(file_path), '0', '0'],
+        stdin=subprocess.DEVNULL, capture_output=True, timeout=timeout
+    )
+    if len(result.stdout) < pdf_pages.FRAME_HEADER.size:
+        raise Exception("PDF could not be opened")
+    kind, length = pdf_pages.FRAME_HEADER.unpack_from(result.stdout)
+    text = result.stdout[pdf_pages.FRAME_HEADER.size:pdf_pages.FRAME_HEADER.size + length].decode('utf-8', 'replace')
+    if kind != pdf_pages.FRAME_COUNT:
+        raise Exception(text)
+    return int(text)
+
+
+# Below this many pages, spawning worker processes costs more than it saves
+PDF_PARALLEL_MIN_PAGES = 8
+
+
+# Extracted-text cache size, checked against the directory after every write; extraction
+# runs in short-lived worker processes, so an in-memory write counter would never fill up
+TEXT_CACHE_MAX_ENTRIES = 2000
+
+
+def _prune_text_cache(cache_dir: str, max_entries: int):
+    """Delete the least recently used extractions beyond max_entries"""
+    try:
+        with os.scandir(cache_dir) as it:
+            names = [entry.name for entry in it if entry.name.endswith('.txt')]
+    except OSError as e:
+        print(f"Error pruning text cache: {e}")
+        return
+    if len(names) <= max_entries:
+        return
+    
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            entries.append((os.stat(path).st_mtime, path))
+        except OSError:
+            # Removed concurrently by another worker
+            pass
+    entries.sort()
+    for _, path in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@functools.lru_cache(maxsize=None)
+def _chunk_tokenizer(name: str):
+    """Load a HuggingFace tokenizer once per process, or None if it cannot be loaded"""
+    if not TOKENIZERS_AVAILABLE:
+        print(f"CHUNK_TOKENIZER={name} is set but 'tokenizers' is not installed, chunking by characters")
+        return None
+    try:
+        return Tokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"Error loading tokenizer {name}, chunking by characters: {str(e)}")
+        return None
 
 
 class TextProcessor:
     """Process various text document formats"""
     
     @staticmethod
-    def process_pdf(file_path: str) -> str:
-        """Extract text from PDF file"""
+    def process_pdf(file_path: str, max_seconds_per_page: Optional[float] = PDF_MAX_SECONDS_PER_PAGE) -> str:
+        """
+        Extract text from PDF file
+        
+        Args:
+            file_path: Path to the PDF file
+            max_seconds_per_page: Extraction budget per page; slower pages are
+                skipped with a marker (None waits indefinitely)
+            
+        Returns:
+            Extracted text
+        """
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text.strip()
+            if PDFTOTEXT_PATH and not pdf_pages.PYMUPDF_AVAILABLE:
+                timeout = None
+                if max_seconds_per_page:
+                    # Sized from the file rather than a page count, which would need a full parse
+                    pages = os.path.getsize(file_path) / PDF_BYTES_PER_PAGE_ESTIMATE
+                    timeout = max_seconds_per_page * max(1.0, pages)
+                try:
+                    # Poppler's C++ extractor; without -layout it skips column reconstruction
+                    result = subprocess.run(
+                        [PDFTOTEXT_PATH, '-q', '-enc', 'UTF-8', file_path, '-'],
+                        capture_output=True, check=True, timeout=timeout
+                    )
+                    # Pages are separated by form feeds
+                    return result.stdout.decode('utf-8', 'replace').replace('\f', '\n').strip()
+                except subprocess.TimeoutExpired:
+                    print(f"pdftotext timed out on {file_path}, extracting page by page")
+                except (subprocess.CalledProcessError, OSError) as e:
+                    # e.g. encrypted or damaged files poppler refuses; pypdf may still read them
+                    print(f"pdftotext failed on {file_path} ({e}), extracting page by page")
+            
+            # PyMuPDF when installed, else pypdf; see pdf_pages.open_pdf
+            if max_seconds_per_page:
+                parts = _extract_pdf_pages_bounded(file_path, max_seconds_per_page)
+            else:
+                parts = pdf_pages.iter_pdf_pages(file_path)
+            return "\n".join(parts).strip()
+        except Exception as e:
+            raise Exception(f"Error processing PDF: {str(e)}")
+    
+    @staticmethod
+    def process_pdf_parallel(file_path: str, workers: Optional[int] = None,
+                             max_seconds_per_page: Optional[float] = PDF_MAX_SECONDS_PER_PAGE) -> str:
+        """
+        Extract text from a PDF, splitting its pages across worker processes
+        
+        Each worker opens the file independently and extracts one contiguous
+        page range under the same per-page budget as process_pdf; ranges are
+        joined back in page order.
+        
+        Args:
+            file_path: Path to the PDF file
+            workers: Number of worker processes (defaults to the CPU count)
+            max_seconds_per_page: Extraction budget per page; slower pages are
+                skipped with a marker (None waits indefinitely)
+            
+        Returns:
+            Extracted text
+        """
+        if not pdf_pages.PYMUPDF_AVAILABLE:
+            return TextProcessor.process_pdf(file_path, max_seconds_per_page)
+        
+        try:
+            page_count = _pdf_page_count(file_path, max_seconds_per_page)
+            
+            workers = min(workers or os.cpu_count() or 1, page_count)
+            if page_count <= PDF_PARALLEL_MIN_PAGES or workers < 2:
+                return TextProcessor.process_pdf(file_path, max_seconds_per_page)
+            
+            # Each thread drives one extraction process for its page range
+            bounds = [page_count * i // workers for i in range(workers + 1)]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                ranges = executor.map(
+                    _extract_pdf_pages_bounded, [file_path] * workers, [max_seconds_per_page] * workers,
+                    bounds[:-1], bounds[1:]
+                )
+                return "\n".join(part for parts in ranges for part in parts).strip()
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
     
@@ -29,9 +447,28 @@ class TextProcessor:
     def process_docx(file_path: str) -> str:
         """Extract text from DOCX file"""
         try:
-            doc = Document(file_path)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            return text.strip()
+            # Stream the document XML instead of building python-docx's object tree
+            paragraphs = []
+            runs = []
+            with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as document:
+                for _, element in ET.iterparse(document):
+                    if element.tag == _W_RUN:
+                        # Walk the finished run so tab stops in paragraph properties are not mistaken for tabs
+                        for child in element:
+                            if child.tag == _W_TEXT:
+                                if child.text:
+                                    runs.append(child.text)
+                            elif child.tag == _W_BREAK:
+                                # Page and column breaks carry no text
+                                if child.get(_W_BREAK_TYPE, 'textWrapping') == 'textWrapping':
+                                    runs.append('\n')
+                            elif child.tag in _W_RUN_WHITESPACE:
+                                runs.append(_W_RUN_WHITESPACE[child.tag])
+                    elif element.tag == _W_PARAGRAPH:
+                        paragraphs.append("".join(runs))
+                        runs.clear()
+                        element.clear()
+            return "\n".join(paragraphs).strip()
         except Exception as e:
             raise Exception(f"Error processing DOCX: {str(e)}")
     
@@ -39,13 +476,13 @@ class TextProcessor:
     def process_pptx(file_path: str) -> str:
         """Extract text from PPTX file"""
         try:
-            prs = Presentation(file_path)
-            text = ""
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-            return text.strip()
+            with zipfile.ZipFile(file_path) as archive:
+                slides = [archive.getinfo(name) for name in _slide_names(archive)]
+            
+            # Slides are independent archive members - inflate and parse them concurrently
+            with ThreadPoolExecutor(max_workers=max(1, min(PPTX_WORKERS, len(slides)))) as executor:
+                texts = executor.map(lambda info: _slide_text(_read_zip_member(file_path, info)), slides)
+                return "\n".join(text for text in texts if text).strip()
         except Exception as e:
             raise Exception(f"Error processing PPTX: {str(e)}")
     
@@ -53,14 +490,9 @@ class TextProcessor:
     def process_markdown(file_path: str) -> str:
         """Extract text from Markdown file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                md_text = file.read()
+            md_text = _read_text(file_path)
             # Convert markdown to plain text (remove formatting)
-            html = markdown.markdown(md_text)
-            # Simple HTML tag removal
-            import re
-            text = re.sub('<[^<]+?>', '', html)
-            return text.strip()
+            return _strip_markdown(md_text).strip()
         except Exception as e:
             raise Exception(f"Error processing Markdown: {str(e)}")
     
@@ -68,24 +500,78 @@ class TextProcessor:
     def process_txt(file_path: str) -> str:
         """Extract text from TXT file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-            return text.strip()
+            return _read_text(file_path).strip()
         except Exception as e:
             raise Exception(f"Error processing TXT: {str(e)}")
     
     @staticmethod
-    def process_file(file_path: str) -> Dict[str, str]:
+    def extract_text_cached(file_path: str, extract: Callable[[str], str], cache_dir: Optional[str],
+                            max_entries: int = TEXT_CACHE_MAX_ENTRIES) -> str:
+        """
+        Extract text, reusing an earlier extraction of identical file contents
+        
+        Extracted text is stored as <cache_dir>/<blake2b of extension and file>.txt,
+        so re-uploading the same document costs one hash pass and one read;
+        the same bytes under another extension go through their own extractor.
+        Text with skipped PDF pages is returned without being cached.
+        
+        Args:
+            file_path: Path to the file
+            extract: Extractor to run on a cache miss
+            cache_dir: Directory holding extracted text (None disables caching)
+            max_entries: Maximum number of extractions kept on disk
+            
+        Returns:
+            Extracted text
+        """
+        if not cache_dir:
+            return extract(file_path)
+        
+        digest = hashlib.blake2b(file_extension(file_path).encode('utf-8') + b'\0', digest_size=16)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        cache_path = os.path.join(cache_dir, digest.hexdigest() + '.txt')
+        
+        try:
+            with open(cache_path, 'r', encoding='utf-8', newline='') as f:
+                text = f.read()
+            # Mark as recently used for pruning
+            os.utime(cache_path)
+            return text
+        except OSError:
+            pass
+        
+        text = extract(file_path)
+        if _PDF_SKIPPED_PAGE.search(text):
+            # A page may only have been slow under load; extract it again next time
+            return text
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Error writing text cache entry: {e}")
+            return text
+        
+        _prune_text_cache(cache_dir, max_entries)
+        return text
+    
+    @staticmethod
+    def process_file(file_path: str, cache_dir: Optional[str] = None) -> Dict[str, str]:
         """
         Process any supported text file and return extracted content
         
         Args:
             file_path: Path to the file
+            cache_dir: Optional directory for caching extracted text by content hash
             
         Returns:
             Dictionary with file info and extracted text
         """
-        file_ext = os.path.splitext(file_path)[1].lower()
+        file_ext = file_extension(file_path)
         file_name = os.path.basename(file_path)
         
         processor_map = {
@@ -99,7 +585,7 @@ class TextProcessor:
         if file_ext not in processor_map:
             raise ValueError(f"Unsupported file type: {file_ext}")
         
-        text = processor_map[file_ext](file_path)
+        text = TextProcessor.extract_text_cached(file_path, processor_map[file_ext], cache_dir)
         
         return {
             "file_name": file_name,
@@ -108,27 +594,60 @@ class TextProcessor:
             "content_type": "text"
         }
     
+    @staticmethod
+    def process_files(file_paths: List[str], cache_dir: Optional[str] = None,
+                      workers: Optional[int] = None) -> Dict[str, Dict[str, str]]:
+        """
+        Process several text files concurrently
+        
+        PDF/DOCX/PPTX parsing is CPU-bound and runs in worker processes;
+        TXT/MD files are just read and decoded, so they run on threads.
+        
+        Args:
+            file_paths: Paths to the files
+            cache_dir: Optional directory for caching extracted text by content hash
+            workers: Number of worker processes (defaults to the CPU count)
+            
+        Returns:
+            Dictionary mapping each path, in input order, to its process_file
+            result, or to {"file_name", "error"} if processing failed
+        """
+        process_paths = [p for p in file_paths if file_extension(p) in PROCESS_POOL_EXTENSIONS]
+        thread_paths = [p for p in file_paths if file_extension(p) not in PROCESS_POOL_EXTENSIONS]
+        
+        futures = {}
+        with ProcessPoolExecutor(max_workers=workers) as process_pool, \
+                ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS) as thread_pool:
+            for pool, paths in ((process_pool, process_paths), (thread_pool, thread_paths)):
+                for file_path in paths:
+                    futures[file_path] = pool.submit(TextProcessor.process_file, file_path, cache_dir)
+            
+            results = {}
+            for file_path in file_paths:
+                try:
+                    results[file_path] = futures[file_path].result()
+                except Exception as e:
+                    results[file_path] = {"file_name": os.path.basename(file_path), "error": str(e)}
+        return results
+    
     @staticmethod
     def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """
-        Split text into overlapping chunks
+        Split text into overlapping chunks, skipping chunks that are only whitespace
+        
+        When config.CHUNK_TOKENIZER names a tokenizer, the text is tokenized
+        once and split into windows of CHUNK_TOKEN_SIZE tokens instead.
         
         Args:
             text: Text to chunk
-            chunk_size: Size of each chunk
-            overlap: Overlap between chunks
+            chunk_size: Size of each chunk in characters
+            overlap: Overlap between chunks in characters
             
         Returns:
             List of text chunks
         """
-        chunks = []
-        start = 0
-        text_length = len(text)
-        
-        while start < text_length:
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start += chunk_size - overlap
-            
-        return chunks
+        tokenizer = _chunk_tokenizer(CHUNK_TOKENIZER) if CHUNK_TOKENIZER else None
+        if tokenizer is not None:
+            return list(chunk_text_tokens(text, tokenizer, CHUNK_TOKEN_SIZE, CHUNK_TOKEN_OVERLAP))
+        chunks = (text[start:end] for start, end in chunk_offsets(len(text), chunk_size, overlap))
+        return [chunk for chunk in chunks if chunk and not chunk.isspace()]
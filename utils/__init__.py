@@ -1,6 +1,8 @@
 """
 Utilities package
 """
-from .file_handler import FileHandler
+from .file_handler import FileHandler, file_extension
+from .chunking import chunk_offsets, chunk_text, chunk_text_tokens
+from .json_provider import OrjsonProvider, ORJSON_AVAILABLE
 
-__all__ = ['FileHandler']
+__all__ = ['FileHandler', 'file_extension', 'chunk_offsets', 'chunk_text', 'chunk_text_tokens', 'OrjsonProvider', 'ORJSON_AVAILABLE']
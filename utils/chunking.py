@@ -0,0 +1,79 @@
+"""
+Text chunking utilities
+"""
+from itertools import chain, repeat
+from typing import Iterator, Tuple
+
+
+def chunk_offsets(length: int, size: int, overlap: int) -> Iterator[Tuple[int, int]]:
+    """
+    Compute the (start, end) boundaries of overlapping chunk windows
+    
+    Starts and ends both come from range() objects, so no per-window
+    arithmetic runs in Python; ends past the text are clamped to its length.
+    
+    Args:
+        length: Length of the text
+        size: Size of each chunk
+        overlap: Overlap between consecutive chunks
+        
+    Returns:
+        Iterator of (start, end) pairs
+    """
+    if not 0 <= overlap < size:
+        raise ValueError(f"overlap must be in [0, size), got size={size}, overlap={overlap}")
+    step = size - overlap
+    return zip(range(0, length, step), chain(range(size, length, step), repeat(length)))
+
+
+def chunk_text(text: str, size: int, overlap: int) -> Iterator[str]:
+    """
+    Lazily split text into overlapping chunks, skipping chunks that are only whitespace
+    
+    Args:
+        text: Text to chunk
+        size: Size of each chunk
+        overlap: Overlap between consecutive chunks
+        
+    Yields:
+        Non-blank text chunks
+    """
+    offsets = chunk_offsets(len(text), size, overlap)
+    return (s for s in (text[start:end] for start, end in offsets) if s and not s.isspace())
+
+
+def chunk_text_tokens(text: str, tokenizer, size: int = 512, overlap: int = 64) -> Iterator[str]:
+    """
+    Lazily split text into overlapping windows of tokens, tokenizing it only once
+    
+    Tokenizers that report character offsets (HuggingFace fast tokenizers and
+    tokenizers.Tokenizer) have their windows sliced straight out of the text;
+    any other tokenizer exposing encode()/decode() (e.g. tiktoken) has each
+    window of token ids decoded back to a string.
+    
+    Args:
+        text: Text to chunk
+        tokenizer: Tokenizer used to split the text
+        size: Number of tokens in each chunk
+        overlap: Number of tokens shared by consecutive chunks
+        
+    Yields:
+        Non-blank text chunks
+    """
+    if getattr(tokenizer, 'is_fast', False):
+        offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping']
+        tokens = None
+    else:
+        # HuggingFace tokenizers add [CLS]/[SEP]-style tokens by default; tiktoken has no such option
+        try:
+            tokens = tokenizer.encode(text, add_special_tokens=False)
+        except TypeError:
+            tokens = tokenizer.encode(text)
+        offsets = getattr(tokens, 'offsets', None)
+    if offsets is not None:
+        # Special tokens added by a post-processor have empty spans
+        spans = [span for span in offsets if span[1] > span[0]]
+        windows = (text[spans[start][0]:spans[end - 1][1]] for start, end in chunk_offsets(len(spans), size, overlap))
+    else:
+        windows = (tokenizer.decode(tokens[start:end]) for start, end in chunk_offsets(len(tokens), size, overlap))
+    return (s for s in windows if s and not s.isspace())
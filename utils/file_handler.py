@@ -1,16 +1,46 @@
 """
 File handling utilities
 """
+import io
 import os
 import shutil
+import tempfile
 from typing import List, Dict
 from config import (
     UPLOAD_FOLDER, 
     ALLOWED_TEXT_EXTENSIONS, 
     ALLOWED_IMAGE_EXTENSIONS,
-    ALLOWED_MEDIA_EXTENSIONS
+    ALLOWED_MEDIA_EXTENSIONS,
+    UPLOAD_BUFFER_SIZE
 )
 
+# Category of every allowed extension, built once instead of per call
+_EXTENSION_CATEGORIES = {
+    **{ext: 'text' for ext in ALLOWED_TEXT_EXTENSIONS},
+    **{ext: 'image' for ext in ALLOWED_IMAGE_EXTENSIONS},
+    **{ext: 'media' for ext in ALLOWED_MEDIA_EXTENSIONS}
+}
+
+
+def file_extension(path: str) -> str:
+    """
+    Lowercased extension of a path, as os.path.splitext would report it
+    
+    Scans from the right once instead of building a (root, ext) tuple.
+    
+    Args:
+        path: File path or name
+        
+    Returns:
+        Extension including the dot, or '' if there is none
+    """
+    dot = path.rfind('.')
+    # Start of the final path component, skipping leading dots (".env" has no extension)
+    start = max(path.rfind('/'), path.rfind(os.sep)) + 1
+    while start < dot and path[start] == '.':
+        start += 1
+    return path[dot:].lower() if dot > start else ''
+
 
 class FileHandler:
     """Handle file operations"""
@@ -26,16 +56,8 @@ class FileHandler:
         Returns:
             File type category: 'text', 'image', 'media', or 'unknown'
         """
-        ext = os.path.splitext(file_path)[1].lower()
-        
-        if ext in ALLOWED_TEXT_EXTENSIONS:
-            return 'text'
-        elif ext in ALLOWED_IMAGE_EXTENSIONS:
-            return 'image'
-        elif ext in ALLOWED_MEDIA_EXTENSIONS:
-            return 'media'
-        else:
-            return 'unknown'
+        ext = file_extension(file_path)
+        return _EXTENSION_CATEGORIES.get(ext, 'unknown')
     
     @staticmethod
     def save_uploaded_file(uploaded_file, upload_folder: str = UPLOAD_FOLDER) -> str:
@@ -43,20 +65,68 @@ class FileHandler:
         Save uploaded file to disk
         
         Args:
-            uploaded_file: Streamlit uploaded file object
+            uploaded_file: Flask FileStorage or Streamlit uploaded file object
             upload_folder: Folder to save file
             
         Returns:
             Path to saved file
         """
         os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, uploaded_file.name)
+        file_name = getattr(uploaded_file, 'filename', None) or uploaded_file.name
+        file_path = os.path.join(upload_folder, os.path.basename(file_name))
         
+        # Flask exposes the data as .stream; Streamlit's upload is itself a file-like object
+        stream = getattr(uploaded_file, 'stream', None)
+        if stream is None:
+            stream = uploaded_file
+            stream.seek(0)
         with open(file_path, 'wb') as f:
-            f.write(uploaded_file.getbuffer())
+            if not FileHandler._sendfile(stream, f):
+                # In-memory upload - copy through a fixed-size buffer
+                shutil.copyfileobj(stream, f, length=UPLOAD_BUFFER_SIZE)
         
         return file_path
     
+    @staticmethod
+    def _sendfile(source, destination) -> bool:
+        """
+        Copy a disk-backed stream into a file with os.sendfile (zero-copy on Linux)
+        
+        Args:
+            source: Stream to copy from, starting at its current position
+            destination: Open file to write to
+            
+        Returns:
+            True if copied, False if sendfile cannot be used for this stream
+        """
+        if not hasattr(os, 'sendfile'):
+            return False
+        # Werkzeug spools small uploads in memory; fileno() would force them out to a temp file first
+        if isinstance(source, tempfile.SpooledTemporaryFile) and not source._rolled:
+            return False
+        try:
+            in_fd = source.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # Other in-memory streams, e.g. BytesIO
+            return False
+        
+        offset = source.tell()
+        remaining = os.fstat(in_fd).st_size - offset
+        out_fd = destination.fileno()
+        copied = 0
+        try:
+            while remaining > 0:
+                sent = os.sendfile(out_fd, in_fd, offset + copied, remaining)
+                if sent == 0:
+                    break
+                copied += sent
+                remaining -= sent
+        except OSError:
+            if copied:
+                raise
+            return False
+        return True
+    
     @staticmethod
     def cleanup_folder(folder_path: str):
         """
@@ -65,16 +135,21 @@ class FileHandler:
         Args:
             folder_path: Path to folder
         """
-        if os.path.exists(folder_path):
-            for filename in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, filename)
+        try:
+            entries = os.scandir(folder_path)
+        except FileNotFoundError:
+            return
+        
+        # DirEntry type checks use the d_type from the directory read - no stat per entry
+        with entries:
+            for entry in entries:
                 try:
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
                 except Exception as e:
-                    print(f"Error deleting {file_path}: {e}")
+                    print(f"Error deleting {entry.path}: {e}")
     
     @staticmethod
     def is_valid_file(filename: str) -> bool:
@@ -87,9 +162,7 @@ class FileHandler:
         Returns:
             True if valid, False otherwise
         """
-        ext = os.path.splitext(filename)[1].lower()
-        all_extensions = ALLOWED_TEXT_EXTENSIONS | ALLOWED_IMAGE_EXTENSIONS | ALLOWED_MEDIA_EXTENSIONS
-        return ext in all_extensions
+        return file_extension(filename) in _EXTENSION_CATEGORIES
     
     @staticmethod
     def get_file_size_mb(file_path: str) -> float:
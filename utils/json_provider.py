@@ -0,0 +1,45 @@
+"""
+Flask JSON provider backed by orjson
+"""
+from flask.json.provider import DefaultJSONProvider
+
+# Optional import with fallback to Flask's default provider
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize Flask responses and templates with orjson"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        """
+        Serialize data as JSON
+        
+        Args:
+            obj: Data to serialize
+            **kwargs: Flask dump options (sort_keys and indent are honored)
+            
+        Returns:
+            JSON string
+        """
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        """
+        Deserialize JSON data
+        
+        Args:
+            s: JSON string or bytes
+            
+        Returns:
+            Deserialized data
+        """
+        return orjson.loads(s)